@@ -0,0 +1,92 @@
+"""LEXOR: DEFAULT parser ALLOCATION benchmark
+
+Counts the strings that the node parsers allocate by slicing the text
+of the document. Slices of length 0 and 1 are shared by the
+interpreter and are not counted. The copies made without slicing,
+such as the result of `lower` on a slice, are not counted either.
+The documents are the ones of `bench_scaling`. Usage:
+
+    python bench_alloc.py [-b BUDGET] [-s SCALE] [construct ...]
+
+A construct whose slices copy more than `BUDGET` bytes per byte of
+input is flagged and the script exits with status 1. The style must
+be visible to lexor, for instance by running `lexor develop` in the
+root of this repository.
+
+"""
+
+import sys
+import optparse
+from lexor.core.parser import Parser
+from bench_scaling import CONSTRUCTS
+
+
+class CountingText(str):
+    """A `str` that counts the slices taken from it along with the
+    number of bytes copied into them. """
+
+    def __new__(cls, text):
+        obj = str.__new__(cls, text)
+        obj.slices = 0
+        obj.copied = 0
+        return obj
+
+    def _count(self, result):
+        """Record the slice `result` if it had to be allocated. """
+        if len(result) > 1:
+            self.slices += 1
+            self.copied += len(result)
+        return result
+
+    def __getitem__(self, key):
+        return self._count(str.__getitem__(self, key))
+
+    def __getslice__(self, start, stop):
+        return self._count(str.__getslice__(self, start, stop))
+
+
+def count_slices(parser, text):
+    """Parse `text` and return the number of slices and the number of
+    bytes copied. """
+    text = CountingText(text)
+    parser.parse(text)
+    return text.slices, text.copied
+
+
+def main():
+    """Print the slices taken per kilobyte of input for each
+    construct. """
+    desc = 'Count the slices that the node parsers take from the text.'
+    opt = optparse.OptionParser(description=desc)
+    opt.add_option('-b', dest='budget', type='float', default=1.5,
+                   help='flag constructs copying more bytes than this '
+                        'per input byte [%default]')
+    opt.add_option('-s', dest='scale', type='int', default=16,
+                   help='generator scale [%default]')
+    options, names = opt.parse_args()
+    constructs = [item for item in CONSTRUCTS
+                  if not names or item[0] in names]
+    parser = Parser('lexor', 'default')
+    print('%-12s %10s %10s %12s %10s' % (
+        'construct', 'KB', 'slices', 'slices/KB', 'copied/B'
+    ))
+    flagged = list()
+    for name, generator in constructs:
+        text = generator(options.scale)
+        slices, copied = count_slices(parser, text)
+        ratio = float(copied) / len(text)
+        mark = ''
+        if ratio > options.budget:
+            mark = '  <-- over budget'
+            flagged.append(name)
+        print('%-12s %10.1f %10d %12.1f %10.2f%s' % (
+            name, len(text) / 1024.0, slices,
+            slices * 1024.0 / len(text), ratio, mark
+        ))
+    if flagged:
+        print('over budget: %s' % ', '.join(flagged))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
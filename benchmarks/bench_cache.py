@@ -0,0 +1,68 @@
+"""LEXOR: DEFAULT parser CACHE benchmark
+
+Simulates the rebuild of a site: every document is parsed once with
+an empty cache and once more with the cache filled by the first run.
+Usage:
+
+    python bench_cache.py [file.lex ...]
+
+If no files are given the documents of `bench_scaling.py` are used.
+The style must be visible to lexor, for instance by running `lexor
+develop` in the root of this repository.
+
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from lexor.command.lang import get_style_module
+from bench_scaling import CONSTRUCTS
+
+
+def rebuild(parser, docs):
+    """Parse every document and return the time it took. """
+    start = time.time()
+    for name, text in docs:
+        parser.parse(text, name)
+    return time.time() - start
+
+
+def cache_size(path):
+    """Number of files and total bytes in the cache directory. """
+    names = os.listdir(path)
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in names)
+    return len(names), size
+
+
+def main():
+    """Print the time of a cold and a warm rebuild. """
+    docs = list()
+    for path in sys.argv[1:]:
+        with open(path) as tmp:
+            docs.append((path, tmp.read()))
+    if not docs:
+        for name, generator in CONSTRUCTS:
+            for num in range(1, 21):
+                docs.append(('%s-%d.lex' % (name, num), generator(num)))
+    style = get_style_module('parser', 'lexor', 'default')
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = style.MOD['cache'].CachedParser(path=path)
+        cold = rebuild(parser, docs)
+        misses = parser.misses
+        warm = rebuild(parser, docs)
+        files, size = cache_size(path)
+        total = sum(len(text) for _, text in docs) / 1024.0
+        print('documents:   %10d (%.1f KB)' % (len(docs), total))
+        print('cold build:  %10.3f s (%d misses)' % (cold, misses))
+        print('warm build:  %10.3f s (%d hits)' % (warm, parser.hits))
+        print('speedup:     %10.1fx' % (cold / max(warm, 1e-9)))
+        print('cache:       %10d files (%.1f KB)' % (files, size / 1024.0))
+    finally:
+        shutil.rmtree(path, True)
+
+
+if __name__ == '__main__':
+    main()
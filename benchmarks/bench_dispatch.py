@@ -0,0 +1,111 @@
+"""LEXOR: DEFAULT parser DISPATCH benchmark
+
+Counts the calls to `make_node` made in the `__default__` context
+through `DispatchNP` and compares them with the calls made by trying
+every node parser in `INLINE` in order, which is what the parser did
+before the dispatch table. Usage:
+
+    python bench_dispatch.py [file.lex ...]
+
+If no files are given a sample document is used. The style must be
+visible to lexor, for instance by running `lexor develop` in the root
+of this repository.
+
+"""
+
+import sys
+from lexor.core.parser import Parser
+
+SAMPLE = """Introduction
+============
+
+This is a *paragraph* with **strong** text, `inline code`, a
+[link](http://example.com "title") and an image ![alt](img.png).
+Prices such as $5 and $10 show up next to math like $x^2 + y^2$ and
+\\(a \\leq b\\). Quotes are "double" and 'single' while entities
+such as &amp; and \\* escapes are also common. A file glob *.py and
+a product 2*3 leave unmatched asterisks behind.
+
+<div class="note" #note1>
+Some <span .hl>highlighted</span> text and a <http://auto.link> or
+a <user@example.com>. %%{em}Lexor elements%% also appear.
+</div>
+
+- - -
+
+"""
+
+
+def _counter(make_node, name, state):
+    """Wrap the `make_node` method of a node parser so that the calls
+    made on behalf of `DispatchNP` are counted. """
+    def counted():
+        """Counting wrapper. """
+        node = make_node()
+        if state['active']:
+            state['dispatched'] += 1
+            if node is not None:
+                state['hit'] = name
+        return node
+    return counted
+
+
+def count_calls(parser, text):
+    """Parse the text and return the number of `make_node` calls made
+    with the dispatch table and the number that trying every node
+    parser in order would have made. """
+    names = parser.style_module.INLINE
+    dispatch = parser['DispatchNP']
+    state = {'active': False, 'dispatched': 0, 'linear': 0, 'hit': None}
+    for name in names:
+        parser[name].make_node = _counter(
+            parser[name].make_node, name, state
+        )
+    original = dispatch.make_node
+
+    def make_node():
+        """Wrapper of `DispatchNP.make_node`. """
+        state['active'] = True
+        state['hit'] = None
+        node = original()
+        state['active'] = False
+        if state['hit'] is None:
+            state['linear'] += len(names)
+        else:
+            state['linear'] += names.index(state['hit']) + 1
+        return node
+
+    dispatch.make_node = make_node
+    try:
+        parser.parse(text)
+    finally:
+        del dispatch.make_node
+        for name in names:
+            del parser[name].make_node
+    return state['dispatched'], state['linear']
+
+
+def main():
+    """Print the calls per kilobyte for each document. """
+    docs = list()
+    for path in sys.argv[1:]:
+        with open(path) as tmp:
+            docs.append((path, tmp.read()))
+    if not docs:
+        docs.append(('<sample>', SAMPLE * 50))
+    parser = Parser('lexor', 'default')
+    parser.load_node_parsers()
+    print('%-30s %10s %12s %12s %8s' % (
+        'document', 'KB', 'linear/KB', 'dispatch/KB', 'saved'
+    ))
+    for name, text in docs:
+        dispatched, linear = count_calls(parser, text)
+        size = max(len(text) / 1024.0, 1e-9)
+        saved = 100.0 * (linear - dispatched) / max(linear, 1)
+        print('%-30s %10.1f %12.1f %12.1f %7.1f%%' % (
+            name[-30:], size, linear / size, dispatched / size, saved
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""LEXOR: DEFAULT parser MEMORY benchmark
+
+Parses a document with many inline spans and reports the memory held
+by the instance dictionaries of the nodes along with the peak
+resident memory of the process. Usage:
+
+    python bench_memory.py [SPANS]
+
+The document has 100000 spans unless `SPANS` is given. The style must
+be visible to lexor, for instance by running `lexor develop` in the
+root of this repository.
+
+"""
+
+import gc
+import sys
+import time
+import resource
+from lexor.core.parser import Parser
+
+PATTERNS = [
+    '*em* ', '**strong** ', '_smart_ ', '__strong__ ', '"quoted" ',
+    '[link](http://x.com) ', '%%{span .c}text%% ',
+]
+
+
+def make_document(spans):
+    """Return a document with `spans` inline spans, ten per line and
+    a blank line every hundred spans. """
+    parts = []
+    for num in range(spans):
+        parts.append(PATTERNS[num % len(PATTERNS)])
+        if num % 10 == 9:
+            parts.append('\n')
+        if num % 100 == 99:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def dict_bytes(node):
+    """Number of nodes in the tree rooted at `node` and the bytes
+    used by their instance dictionaries. """
+    total = 0
+    size = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        total += 1
+        if hasattr(node, '__dict__'):
+            size += sys.getsizeof(node.__dict__)
+        if node.child:
+            stack.extend(node.child)
+    return total, size
+
+
+def main():
+    """Print the memory statistics. """
+    spans = 100000
+    if len(sys.argv) > 1:
+        spans = int(sys.argv[1])
+    text = make_document(spans)
+    parser = Parser('lexor', 'default')
+    parser.load_node_parsers()
+    gc.collect()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    parser.parse(text)
+    elapsed = time.time() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    total, size = dict_bytes(parser.doc)
+    print('document:        %10.1f KB, %d spans' % (len(text) / 1024.0, spans))
+    print('parse time:      %10.3f s' % elapsed)
+    print('nodes:           %10d' % total)
+    print('node dicts:      %10.1f KB (%.1f bytes/node)' % (
+        size / 1024.0, float(size) / total
+    ))
+    print('peak RSS growth: %10.1f MB' % ((after - before) / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
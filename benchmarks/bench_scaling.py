@@ -0,0 +1,199 @@
+"""LEXOR: DEFAULT parser SCALING benchmark
+
+Generates documents that stress one construct at a time, parses them
+at increasing sizes and reports the throughput along with the growth
+of the parse time. The time is fitted to `size ** k`, a construct
+whose exponent `k` exceeds the threshold is flagged since it means
+that some node parser is doing more than linear work. Usage:
+
+    python bench_scaling.py [-t THRESHOLD] [-r REPEAT] [construct ...]
+
+Run without arguments to benchmark every construct. The style must be
+visible to lexor, for instance by running `lexor develop` in the root
+of this repository.
+
+"""
+
+import sys
+import math
+import time
+import optparse
+from lexor.core.parser import Parser
+
+
+def gen_emphasis(num):
+    """Paragraphs with many emphasis delimiters, half of them
+    unmatched. """
+    line = '*a* **b** ***c*** _d_ __e__ * f ** g _ h *i_ j__ '
+    return '\n\n'.join(line * 4 for _ in range(num))
+
+
+def gen_nested(num):
+    """Elements nested in each other. """
+    depth = 20
+    block = '%%{div}' * depth + 'text' + '%%' * depth
+    return '\n\n'.join(block for _ in range(num))
+
+
+def gen_inline(num):
+    """Paragraphs of inline markup nested in each other. """
+    line = ('*a **b _c "d [e ***f `g` h*** i](j) k" l_ m** n* '
+            '<em>o <strong>p *q* r</strong> s</em> ')
+    return '\n\n'.join(line * 4 for _ in range(num))
+
+
+def gen_fenced(num):
+    """Fenced code blocks with long bodies. """
+    body = '\n'.join('x = %d  # comment with *stars*' % i for i in range(20))
+    return '\n\n'.join('~~~~\n%s\n~~~~' % body for _ in range(num))
+
+
+def gen_indented(num):
+    """Indented code blocks with long bodies. """
+    body = '\n'.join('    y = [%d] + (x * 2)' % i for i in range(20))
+    return '\n\ntext\n\n'.join(body for _ in range(num))
+
+
+def gen_references(num):
+    """Links, images and reference definitions with nested
+    brackets. """
+    line = '[a [b] c](http://x.com "t") ![i [j]](i.png) [r][ref] [x]]['
+    refs = '[ref]: http://example.com "title"'
+    return '\n\n'.join('%s\n%s\n\n%s' % (line, line, refs) for _ in range(num))
+
+
+def gen_dollars(num):
+    """Text with many dollar signs, only some of them delimiting
+    math. """
+    line = 'costs $5 and $10 while $x^2$ and $$y$$ and \\(z\\) and $ '
+    return '\n\n'.join(line * 4 for _ in range(num))
+
+
+def gen_prices(num):
+    """A single paragraph of amounts and unclosed math delimiters. """
+    return 'price \\(5 and $5 or \\$6 and $x ' * (num * 16)
+
+
+def gen_angles(num):
+    """Paragraphs with every kind of construct that starts with `<`
+    or `%%`, along with literal ones. """
+    line = ('<a@b.c> <http://d.e> <em>f</em> </g> <!--h--> <?i j?> '
+            '%%{k}l%% %%!m%% a < b ')
+    return '\n\n'.join(line * 4 for _ in range(num))
+
+
+def gen_comments(num):
+    """Long comments spread across many lines. """
+    body = '\n'.join('comment line %d with <tags> and *stars*' % i
+                     for i in range(20))
+    return '\n\n'.join('<!--\n%s\n-->\ntext' % body for _ in range(num))
+
+
+def gen_lists(num):
+    """List blocks with nested items. """
+    items = '\n'.join('+ item %d\n++ sub *item* %d' % (i, i) for i in range(10))
+    return '\n\n'.join('%%{list}\n' + items + '\n%%' for _ in range(num))
+
+
+CONSTRUCTS = [
+    ('emphasis', gen_emphasis),
+    ('nested', gen_nested),
+    ('inline', gen_inline),
+    ('fenced', gen_fenced),
+    ('indented', gen_indented),
+    ('references', gen_references),
+    ('dollars', gen_dollars),
+    ('prices', gen_prices),
+    ('angles', gen_angles),
+    ('comments', gen_comments),
+    ('lists', gen_lists),
+]
+
+
+def count_nodes(node):
+    """Number of nodes in the tree rooted at `node`. """
+    total = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        total += 1
+        if node.child:
+            stack.extend(node.child)
+    return total
+
+
+def time_parse(parser, text, repeat):
+    """Best time out of `repeat` parses of `text`. """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        parser.parse(text)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def fit_exponent(sizes, times):
+    """Slope of the least squares line through the points
+    `(log size, log time)`. """
+    xval = [math.log(size) for size in sizes]
+    yval = [math.log(max(elapsed, 1e-9)) for elapsed in times]
+    xmean = sum(xval) / len(xval)
+    ymean = sum(yval) / len(yval)
+    num = sum((x - xmean) * (y - ymean) for x, y in zip(xval, yval))
+    den = sum((x - xmean) ** 2 for x in xval)
+    return num / den
+
+
+def bench(parser, generator, scales, repeat):
+    """Parse the output of `generator` at every scale. Return the
+    sizes, times and node counts. """
+    sizes, times, nodes = list(), list(), list()
+    for num in scales:
+        text = generator(num)
+        times.append(time_parse(parser, text, repeat))
+        sizes.append(len(text))
+        nodes.append(count_nodes(parser.doc))
+    return sizes, times, nodes
+
+
+def main():
+    """Print the throughput and the fitted exponent of each
+    construct. """
+    desc = 'Check how the parse time grows with the size of the input.'
+    opt = optparse.OptionParser(description=desc)
+    opt.add_option('-t', dest='threshold', type='float', default=1.3,
+                   help='flag exponents above this value [%default]')
+    opt.add_option('-r', dest='repeat', type='int', default=3,
+                   help='number of parses per size [%default]')
+    opt.add_option('-s', dest='scales', default='8,16,32,64',
+                   help='comma separated generator scales [%default]')
+    options, names = opt.parse_args()
+    scales = [int(num) for num in options.scales.split(',')]
+    constructs = [item for item in CONSTRUCTS
+                  if not names or item[0] in names]
+    parser = Parser('lexor', 'default')
+    print('%-12s %10s %10s %12s %8s' % (
+        'construct', 'KB', 'KB/s', 'nodes/s', 'k'
+    ))
+    flagged = list()
+    for name, generator in constructs:
+        sizes, times, nodes = bench(parser, generator, scales, options.repeat)
+        exponent = fit_exponent(sizes, times)
+        elapsed = max(times[-1], 1e-9)
+        mark = ''
+        if exponent > options.threshold:
+            mark = '  <-- superlinear'
+            flagged.append(name)
+        print('%-12s %10.1f %10.1f %12.1f %8.2f%s' % (
+            name, sizes[-1] / 1024.0, sizes[-1] / 1024.0 / elapsed,
+            nodes[-1] / elapsed, exponent, mark
+        ))
+    if flagged:
+        print('superlinear: %s' % ', '.join(flagged))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,9 @@ from lexor import init, load_aux
 
 DEFAULTS = {
     'inline': 'off',
+    'lazy': 'off',
+    'profile': 'off',
+    'schedule': 'on',
 }
 INFO = init(
     version=(0, 0, 1, 'rc', 9),
@@ -23,6 +26,7 @@ INFO = init(
 )
 MOD = load_aux(INFO)
 REPOSITORY = [
+    MOD['angle'].AngleNP,
     MOD['auto'].AutoLinkNP,
     MOD['auto'].AutoMailNP,
     MOD['cdata'].CDataNP,
@@ -30,6 +34,7 @@ REPOSITORY = [
     MOD['code'].CodeInlineNP,
     MOD['code'].CodeBlockNP,
     MOD['define'].MacroNP,
+    MOD['dispatch'].DispatchNP,
     MOD['doctype'].DocumentTypeNP,
     MOD['element'].ElementNP,
     MOD['empty'].EmptyNP,
@@ -44,39 +49,51 @@ REPOSITORY = [
     MOD['inline'].Strong2NP,
     MOD['inline'].EmNP,
     MOD['inline'].SmartEmNP,
+    MOD['instrument'].InstrumentNP,
     MOD['latex'].LatexDisplayNP,
     MOD['latex'].LatexInlineNP,
+    MOD['line'].LineNP,
     MOD['list'].ListNP,
     MOD['meta'].MetaNP,
+    MOD['opaque'].OpaqueNP,
     MOD['paragraph'].ParagraphNP,
     MOD['pi'].ProcessingInstructionNP,
     MOD['quote'].QuoteNP,
     MOD['reference'].ReferenceBlockNP,
     MOD['reference'].ReferenceInlineNP,
+    MOD['schedule'].ScheduleNP,
+    MOD['span'].SpanNP,
+    MOD['stack'].StackNP,
+]
+# Node parsers that `DispatchNP` tries in the `__default__` context.
+# Only the ones whose `trigger` contains the character at the caret
+# are called, in the order listed here.
+INLINE = [
+    'CodeInlineNP',
+    'ReferenceInlineNP',
+    'LatexDisplayNP',
+    'LatexInlineNP',
+    'StrongEmNP',
+    'EmStrongNP',
+    'StrongNP',
+    'Strong2NP',
+    'EmNP',
+    'SmartEmNP',
+    'QuoteNP',
+    'BreakNP',
+    'AutoMailNP',
+    'AutoLinkNP',
+    'ElementNP',
+    'CDataNP',
+    'DocumentTypeNP',
+    'CommentNP',
+    'ProcessingInstructionNP',
+    'EntityNP',
 ]
 MAPPING = {
     '__default__': (
         '<&\\\\`\'\"*_{}[\\]()#+-.!%$:\n', [
-            'CodeInlineNP',
-            'ReferenceInlineNP',
-            'LatexDisplayNP',
-            'LatexInlineNP',
-            'StrongEmNP',
-            'EmStrongNP',
-            'StrongNP',
-            'Strong2NP',
-            'EmNP',
-            'SmartEmNP',
-            'QuoteNP',
-            'BreakNP',
-            'AutoMailNP',
-            'AutoLinkNP',
-            'ElementNP',
-            'CDataNP',
-            'DocumentTypeNP',
-            'CommentNP',
-            'ProcessingInstructionNP',
-            'EntityNP',
+            'DispatchNP',
         ]
     ),
     '#document': (
@@ -119,7 +136,25 @@ MAPPING = {
 
 def parser_setup(parser):
     """Using options to configure the parser. """
+    parser['DispatchNP'].build(INLINE)
+    if parser.defaults['schedule'] == 'on':
+        parser['ScheduleNP'].install()
+    if parser.defaults['lazy'] == 'on':
+        parser['SpanNP'].install()
+    if parser.defaults['profile'] == 'on':
+        parser['InstrumentNP'].install()
     if parser.defaults['inline'] == 'on':
         parser.style_module.MAPPING = {
             '__default__': parser.style_module.MAPPING['__default__']
         }
+
+
+def pre_process(parser):
+    """Clear the records of the previous parse. """
+    if parser.defaults['profile'] == 'on':
+        parser['InstrumentNP'].reset()
+
+
+def post_process(parser):
+    """Declare the macros of the parsed document. """
+    parser['MacroNP'].collect()
@@ -0,0 +1,112 @@
+"""LEXOR: ANGLE NodeParser
+
+A `<` may start an automatic link, an automatic email, an element, a
+comment, character data, a document type, a processing instruction or
+a stray end tag, and a `%%` may start an element, a comment, a
+document type or a processing instruction. Instead of having each of
+these node parsers probe the same offset, the offset is classified
+once and the node parsers look up the verdict.
+
+"""
+
+import re
+from lexor.core.parser import NodeParser
+
+MAIL_RE = re.compile(r'([^> \!]*@[^> ]*)')
+URL_RE = re.compile(r'((?:[Ff]|[Hh][Tt])[Tt][Pp][Ss]?://[^>]*)')
+EMPTY = ' \t\n\r\f\v'
+
+
+class AngleNP(NodeParser):
+    """Decides what starts at a `<` or a `%%`. This node parser does
+    not create nodes. The verdict for an offset is a tuple
+
+        (kind, end)
+
+    where `kind` is one of the constants below and `end` is the index
+    of the `>` or `}` that ends the construct, or -1 if the node
+    parser of the construct finds its own end. The verdicts follow
+    the order in which the node parsers are tried: a `<` that may be
+    both an automatic email and an element is an automatic email.
+    They are computed once per offset and do not depend on the block
+    being parsed, the node parsers compare `end` with their search
+    window. """
+    LITERAL = 0
+    AUTOMAIL = 1
+    AUTOLINK = 2
+    ELEMENT = 3
+    CDATA = 4
+    DOCTYPE = 5
+    COMMENT = 6
+    PI = 7
+    END_TAG = 8
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._memo = dict()
+
+    def classify(self, index):
+        """Return the verdict for the offset `index`. """
+        text = self.parser.text
+        char = text[index:index+1]
+        if char != '<' and not text.startswith('%%', index):
+            return self.LITERAL, -1
+        if self._text is not text:
+            self._text = text
+            self._memo.clear()
+        verdict = self._memo.get(index)
+        if verdict is None:
+            if char == '<':
+                verdict = self._classify_lt(text, index)
+            else:
+                verdict = self._classify_percent(text, index)
+            self._memo[index] = verdict
+        return verdict
+
+    def _classify_lt(self, text, index):
+        """Helper function for classify. """
+        element = self.parser['ElementNP']
+        end = element.find_gt(index, len(text))
+        if end != -1:
+            if MAIL_RE.match(text, index+1, end):
+                return self.AUTOMAIL, end
+            if URL_RE.match(text, index+1, end):
+                return self.AUTOLINK, end
+        tag = element.get_tag(index)
+        if tag is not None:
+            return self.ELEMENT, tag[0]
+        if text.startswith('<![CDATA[', index):
+            return self.CDATA, -1
+        char = text[index+1:index+2]
+        if char == '!':
+            return self._doctype_or_comment(text, index, '<!doctype')
+        if char == '?':
+            return self.PI, -1
+        if char == '/':
+            return self.END_TAG, end
+        return self.LITERAL, -1
+
+    def _classify_percent(self, text, index):
+        """Helper function for classify. """
+        tag = self.parser['ElementNP'].get_tag(index)
+        if tag is not None:
+            return self.ELEMENT, tag[0]
+        char = text[index+2:index+3]
+        if char == '!':
+            return self._doctype_or_comment(text, index, '%%!doctype')
+        if char == '?':
+            return self.PI, -1
+        return self.LITERAL, -1
+
+    def _doctype_or_comment(self, text, index, keyword):
+        """Helper function for classify. The case of the text is
+        ignored when it is compared with the keyword. """
+        opaque = self.parser['OpaqueNP']
+        end = index + len(keyword)
+        if opaque.startswith(keyword, index) and text[end:end+1] in EMPTY:
+            return self.DOCTYPE, -1
+        return self.COMMENT, -1
+
+    def make_node(self):
+        return None
@@ -0,0 +1,28 @@
+"""LEXOR: BASE Parser
+
+Base class of the parsers defined in this style. The modules of the
+style obtain it with
+
+    from lexor.command.lang import load_rel
+    StyleParser = load_rel(__file__, 'base').StyleParser
+
+since they are not loaded as part of a package.
+
+"""
+
+from lexor.core.parser import Parser
+
+
+class StyleParser(Parser):
+    """A `Parser` whose class is defined in a module of this style.
+    The main parsing loop issues its messages under the module of the
+    class of the parser, but only the module of `Parser` explains
+    them. """
+
+    # pylint: disable=R0913
+    def msg(self, mod_name, code, pos, arg=None, uri=None):
+        """The messages issued by the main parsing loop are stored
+        under the module of `Parser`. """
+        if mod_name == self.__module__:
+            mod_name = Parser.__module__
+        Parser.msg(self, mod_name, code, pos, arg, uri)
@@ -0,0 +1,144 @@
+"""LEXOR: BATCH Parser
+
+Parser for many documents at once, for instance all the pages of a
+site. The documents are parsed in a pool of processes:
+
+    from lexor.command.lang import get_style_module
+    style = get_style_module('parser', 'lexor', 'default')
+    parser = style.MOD['batch'].BatchParser(processes=4)
+    for result in parser.iterparse(names, paths=True):
+        print(result)
+
+The workers send the trees back as the records of the `record`
+module.
+
+"""
+
+import traceback
+from multiprocessing import Pool
+from timeit import default_timer
+from lexor.core.parser import Parser
+from lexor.command.lang import load_rel
+
+StyleParser = load_rel(__file__, 'base').StyleParser
+
+
+class BatchResult(object):
+    """The outcome of parsing one of the documents given to
+    `BatchParser.iterparse`. `index` is the position of the document
+    in the input and `uri` its name, None for a text that could not
+    be parsed. `doc` and `log` hold the parsed document and its
+    messages, `time` is the number of seconds it took to read and
+    parse it. If the document could not be read or parsed then `doc`
+    and `log` are None and `error` holds the traceback of the
+    exception. """
+
+    __slots__ = ('index', 'uri', 'doc', 'log', 'time', 'error')
+
+    def __init__(self, index, uri, doc=None, log=None, time=0.0,
+                 error=None):
+        self.index = index
+        self.uri = uri
+        self.doc = doc
+        self.log = log
+        self.time = time
+        self.error = error
+
+    def __repr__(self):
+        if self.error is not None:
+            return '<BatchResult %d %r: error>' % (self.index, self.uri)
+        return '<BatchResult %d %r: %d messages in %.3fs>' % (
+            self.index, self.uri, len(self.log.child), self.time
+        )
+
+
+class BatchParser(StyleParser):
+    """A `Parser` for many documents. The documents are distributed
+    among a pool of `processes` workers, every worker sets up its node
+    parsers once and uses them for all the documents it receives:
+
+        parser = BatchParser(processes=4)
+        for result in parser.iterparse(names, paths=True):
+            if result.error is None:
+                writer.write(result.doc, result.uri + '.html')
+
+    The results are yielded in the order of the input, or as soon as
+    they are ready if `ordered` is False. The documents are sent to
+    the workers in groups of `chunksize`. With `processes` set to 0
+    the documents are parsed in the current process with the node
+    parsers of this parser. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None,
+                 processes=None, chunksize=1):
+        Parser.__init__(self, lang, style, defaults)
+        self.processes = processes
+        self.chunksize = chunksize
+
+    def iterparse(self, sources, paths=False, ordered=True):
+        """Parse every document in `sources` and yield a
+        `BatchResult` for each one of them. The sources are the texts
+        of the documents or, if `paths` is True, the names of the
+        files that contain them. """
+        if self._reload:
+            self.load_node_parsers()
+        tasks = ((num, src, paths) for num, src in enumerate(sources))
+        if self.processes == 0:
+            for task in tasks:
+                result = _parse_document(self, task)
+                if result.error is None:
+                    result.doc, result.log = self.doc, self.log
+                yield result
+            return
+        record = self.style_module.MOD['record']
+        pool = Pool(self.processes, _init_worker, (self,))
+        try:
+            if ordered:
+                results = pool.imap(_batch_task, tasks, self.chunksize)
+            else:
+                results = pool.imap_unordered(
+                    _batch_task, tasks, self.chunksize
+                )
+            for result, data in results:
+                if data is not None:
+                    result.doc, result.log = record.load_document(
+                        data, self._lang, result.uri
+                    )
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def _init_worker(parser):
+    """Keep the parser given to the process pool. The parser was
+    prepared by `iterparse` before the process was started. """
+    _init_worker.parser = parser
+_init_worker.parser = None
+
+
+def _parse_document(parser, task):
+    """Read and parse one of the documents of a batch. Return a
+    `BatchResult` without the document, which is left in `parser`. """
+    num, src, is_path = task
+    uri = src if is_path else None
+    start = default_timer()
+    try:
+        text = open(src).read() if is_path else src
+        parser.parse(text, uri)
+    except Exception:  # pylint: disable=W0703
+        return BatchResult(num, uri, time=default_timer()-start,
+                           error=traceback.format_exc())
+    return BatchResult(num, parser.doc.uri_, time=default_timer()-start)
+
+
+def _batch_task(task):
+    """Parse a document of a batch in a worker process. Return the
+    result along with the record of the document. """
+    parser = _init_worker.parser
+    result = _parse_document(parser, task)
+    if result.error is not None:
+        return result, None
+    record = parser.style_module.MOD['record']
+    entry = (parser.doc, list(parser.log.child), parser.log.modules, 1)
+    return result, record.dump_entry(entry)
@@ -0,0 +1,193 @@
+"""LEXOR: CACHE Parser
+
+Parser that keeps the documents it parses on disk between runs, for
+instance when a site is built again after changing a few of its
+pages:
+
+    from lexor.command.lang import get_style_module
+    style = get_style_module('parser', 'lexor', 'default')
+    parser = style.MOD['cache'].CachedParser(path='/tmp/lexor-cache')
+    parser.parse(text)
+
+The trees are stored as the records of the `record` module.
+
+"""
+
+import os
+import zlib
+import hashlib
+import tempfile
+import cPickle as pickle
+from lexor.core.parser import Parser
+from lexor.command.lang import load_rel
+
+StyleParser = load_rel(__file__, 'base').StyleParser
+
+
+class CachedParser(StyleParser):
+    """A `Parser` that keeps the trees and messages of the documents
+    it parses in a directory. The file of a document is named after
+    a hash of its text, the version and source code of the style and
+    the parser options, a document that has been parsed before is
+    loaded from its file without running the node parsers:
+
+        parser = CachedParser(path='/tmp/lexor-cache')
+        parser.parse(text)
+
+    The least recently used files are removed once their total size
+    goes over `limit` bytes, until it is down to three quarters of
+    it. The total is measured when the first file is stored and then
+    kept up to date with the sizes of the files stored by the parser,
+    the directory is measured again only when the total goes over
+    the limit. The number of documents loaded from the cache and the
+    number of documents parsed are counted in `hits` and `misses`. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None,
+                 path=None, limit=64*1024*1024):
+        Parser.__init__(self, lang, style, defaults)
+        if path is None:
+            path = os.path.join(tempfile.gettempdir(), 'lexor-cache')
+        self.path = path
+        self.limit = limit
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def key(self, text):
+        """Return the name of the file that holds the result of
+        parsing `text`. """
+        info = self.style_module.INFO
+        digest = hashlib.sha1()
+        digest.update(repr((
+            self._lang, self._style, info['version'],
+            sorted(self.defaults.items()), type(text).__name__,
+        )))
+        digest.update(style_digest(info['path']))
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        digest.update(text)
+        return digest.hexdigest()
+
+    def parse(self, text, uri=None):
+        """Load the result of parsing `text` from the cache or parse
+        it and store the result. """
+        if self._reload:
+            self.load_node_parsers()
+        record = self.style_module.MOD['record']
+        key = self.key(text)
+        if not uri:
+            uri = 'string@0x%x' % id(text)
+        data = self._load(self._read(key), uri)
+        if data is None:
+            self.misses += 1
+            Parser.parse(self, text, uri)
+            entry = (self.doc, list(self.log.child), self.log.modules, 1)
+            self._write(key, (record.dump_entry(entry), self.caret,
+                              self.pos))
+            return
+        self.hits += 1
+        self._uri = uri
+        self.text = text
+        if hasattr(self.style_module, 'pre_process'):
+            self.style_module.pre_process(self)
+        self.doc, self.log, self.caret, self.pos = data
+        self['MacroNP'].collect(report=False)
+        self.end = len(text)
+
+    def _load(self, data, uri):
+        """Return the document, the log, the caret and the position
+        stored in `data` or None if `data` is None or it does not hold
+        a valid record. """
+        if data is None:
+            return None
+        record = self.style_module.MOD['record']
+        try:
+            doc, log = record.load_document(data[0], self._lang, uri)
+            return doc, log, data[1], list(data[2])
+        except (TypeError, ValueError, KeyError, IndexError,
+                AttributeError):
+            return None
+
+    def _read(self, key):
+        """Return the data stored under `key` or None. """
+        name = os.path.join(self.path, key)
+        try:
+            with open(name, 'rb') as tmp:
+                data = tmp.read()
+            data = pickle.loads(zlib.decompress(data))
+        except (IOError, OSError, EOFError, ValueError, zlib.error,
+                pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        try:
+            os.utime(name, None)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, key, data):
+        """Store `data` under `key` and remove the least recently
+        used files if the cache is too big. """
+        data = zlib.compress(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        if len(data) > self.limit:
+            return
+        name = os.path.join(self.path, key)
+        try:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            tmpname = '%s.%d.tmp' % (name, os.getpid())
+            with open(tmpname, 'wb') as tmp:
+                tmp.write(data)
+            os.rename(tmpname, name)
+        except (IOError, OSError):
+            return
+        if self._size is not None:
+            self._size += len(data)
+        if self._size is None or self._size > self.limit:
+            self.evict()
+
+    def evict(self):
+        """Measure the total size of the cache and, if it is over
+        `limit` bytes, remove the least recently used files until it
+        is at most three quarters of `limit`. """
+        files = list()
+        total = 0
+        for name in os.listdir(self.path):
+            name = os.path.join(self.path, name)
+            try:
+                info = os.stat(name)
+            except OSError:
+                continue
+            files.append((info.st_mtime, name, info.st_size))
+            total += info.st_size
+        files.sort()
+        if total > self.limit:
+            for _, name, size in files:
+                if total <= self.limit * 3 // 4:
+                    break
+                try:
+                    os.remove(name)
+                except OSError:
+                    continue
+                total -= size
+        self._size = total
+
+
+def style_digest(path):
+    """Return a hash of the source code of the style whose main
+    module is at `path`, including its auxiliary modules. """
+    if path not in style_digest.cache:
+        digest = hashlib.sha1()
+        dirpath = os.path.splitext(os.path.abspath(path))[0]
+        names = [path]
+        if os.path.isdir(dirpath):
+            names.extend(
+                os.path.join(dirpath, name)
+                for name in sorted(os.listdir(dirpath))
+                if name.endswith('.py') and 'test' not in name
+            )
+        for name in names:
+            with open(os.path.splitext(name)[0] + '.py', 'rb') as tmp:
+                digest.update(tmp.read())
+        style_digest.cache[path] = digest.hexdigest()
+    return style_digest.cache[path]
+style_digest.cache = dict()
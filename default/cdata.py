@@ -25,19 +25,22 @@ from lexor.core.elements import CData
 class CDataNP(NodeParser):
     """Retrives the data enclosed within `<![CDATA[` and `]]>` and
     returns a `CData` node. """
+    trigger = '<'
 
     def make_node(self):
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+9] != '<![CDATA[':
+        angle = parser['AngleNP']
+        if angle.classify(caret)[0] != angle.CDATA:
             return None
-        index = parser.text.find(']]>', caret+9)
+        spans = parser['SpanNP']
+        index = parser['OpaqueNP'].find(']]>', caret+9)
         if index == -1:
             self.msg('E100', parser.pos)
             parser.update(parser.end)
-            return CData(parser.text[caret+9:parser.end])
+            return spans.new(CData, spans.span(caret+9, parser.end))
         parser.update(index+3)
-        return CData(parser.text[caret+9:index])
+        return spans.new(CData, spans.span(caret+9, index))
 
 
 MSG = {
@@ -3,6 +3,7 @@
 """
 
 import re
+from functools import partial
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Element, Text
 LANG_RE = re.compile(r'''
@@ -10,17 +11,32 @@ LANG_RE = re.compile(r'''
     (?P<path>(?:/\w+)*[/ ])?        # Zero or 1 path
     (?P<lang>[\w+-]*)               # The language
     ''', re.VERBOSE)
-FENCED = re.compile(r'\n~{3,}[~]+[ ]*(\n|$)')
+INDENTED_RE = re.compile(r'(?:\n(?:    |\t)[^\n]*)*')
+INDENT_RE = re.compile(r'^(?:    |\t)', re.M)
+
+
+def strip_code(content):
+    """Remove the whitespace around inline code. Code made only of
+    whitespace becomes a single space. """
+    return content.strip() or ' '
+
+
+def join_indented(block, content):
+    """Return the body of an indented code block whose first lines
+    are in `block` and whose remaining lines, still indented, are in
+    `content`. """
+    return '\n'.join(block + [INDENT_RE.sub('', content)])
 
 
 class CodeInlineNP(NodeParser):
     """Obtain code enclosed by backticks. """
+    trigger = '`'
 
     @staticmethod
     def build_node(parser, content):
         """Build the actual node with the given content. """
         node = Element('code')
-        node.append_child(Text(content))
+        node.append_child(parser['SpanNP'].new(Text, content))
         parser['ElementNP'].get_attribute_list(parser, node)
         return [node]
 
@@ -36,12 +52,10 @@ class CodeInlineNP(NodeParser):
         except IndexError:
             pass
         if ambiguous:
-            self.msg('E100', parser.pos, parser.compute(end_index))
+            pos = parser['LineNP'].position(end_index)
+            self.msg('E100', parser.pos, pos)
         parser.update(end_index+count)
-        content = parser.text[index:end_index].strip()
-        if not content:
-            content = ' '
-        return content
+        return parser['SpanNP'].span(index, end_index, strip_code)
 
     def make_node(self):
         parser = self.parser
@@ -56,22 +70,24 @@ class CodeInlineNP(NodeParser):
         except IndexError:
             index += 1
         total = count
-        end_index = parser.text.find('`'*count, index, parser.end)
+        opaque = parser['OpaqueNP']
+        end = parser['LineNP'].window()
+        end_index = opaque.find('`'*count, index, end)
         if end_index != -1:
             content = self.obtain_content(parser, index, end_index, count)
             return self.build_node(parser, content)
         start = index
         while count > 0:
-            end_index = parser.text.find('`'*count, index, parser.end)
+            end_index = opaque.find('`'*count, index, end)
             if end_index > 0:
-                pos = parser.compute(end_index)
+                pos = parser['LineNP'].position(end_index)
                 self.msg('E100', parser.pos, pos)
                 parser.update(end_index+count)
                 content = parser.text[start:end_index].strip()
                 return self.build_node(parser, content)
             count -= 1
             start -= 1
-        pos = parser.compute(parser.caret+total)
+        pos = parser['LineNP'].position(parser.caret+total)
         self.msg('E101', parser.pos, pos)
         parser.update(parser.caret+total)
         return Text('`'*(total))
@@ -165,12 +181,13 @@ class CodeBlockNP(NodeParser):
     Note that this does not replace the characters '<' and '&'. The
     writer must convert these characters in the output."""
 
-    def get_fenced_block(self, match):
-        """Parse a fenced block code. """
+    def get_fenced_block(self, start, end):
+        """Parse a fenced block code whose opening row of `~` is in
+        `parser.text[start:end]`. """
         parser = self.parser
         text = parser.text
-        total = text[match.start()+1:match.end()].count('~')
-        parser.update(match.end())
+        total = text[start+1:end].count('~')
+        parser.update(end)
         node = Element('codeblock')
 
         index = parser.text.find('\n', parser.caret)
@@ -196,24 +213,30 @@ class CodeBlockNP(NodeParser):
         else:
             parser.update(index+1)
 
-        rfenced = re.compile(r'\n~{'+str(total-1)+',}[~]+[ ]*(\n|$)')
-        match = rfenced.search(text, parser.caret)
-        if not match:
+        lines = parser['LineNP']
+        spans = parser['SpanNP']
+        # The first line, when it is kept, goes before the body.
+        transform = append.__add__ if append else None
+        num = lines.next_fence(parser.caret, total)
+        if num is None:
             self.msg('E200', parser.pos, [total])
-            node.append_child(append+text[parser.caret:])
+            content = spans.span(parser.caret, parser.end, transform)
+            node.append_child(spans.new(Text, content))
             parser.update(parser.end)
             return [node]
-        node.append_child(append+text[parser.caret:match.start()])
-        parser.update(match.end())
+        end = lines.start(num) - 1
+        content = spans.span(parser.caret, end, transform)
+        node.append_child(spans.new(Text, content))
+        parser.update(lines.end(num))
         return [node]
 
     def make_node(self):
         parser = self.parser
-        match = FENCED.match(parser.text, parser.caret-1)
-        if match:
-            return self.get_fenced_block(match)
-        text = self.parser.text[parser.caret:parser.caret+4]
-        if text != 4*' ' and text[0:1] != '\t':
+        lines = parser['LineNP']
+        num = lines.line_after(parser.caret-1)
+        if lines.is_kind(num, lines.FENCE):
+            return self.get_fenced_block(lines.start(num)-1, lines.end(num))
+        if not parser.text.startswith(('    ', '\t'), parser.caret):
             return None
         node = Element('codeblock')
 
@@ -233,20 +256,23 @@ class CodeBlockNP(NodeParser):
             parser.update(left_b)
             self.parser['ElementNP'].get_attribute_list(parser, node)
 
-        while index < parser.end:
-            old_index = index + 1
-            index = parser.text.find('\n', old_index, parser.end)
+        # The following indented lines are found and stripped at once,
+        # the line that ends the block is skipped.
+        spans = parser['SpanNP']
+        match = INDENTED_RE.match(parser.text, index, parser.end)
+        if match.end() > index:
+            content = spans.span(
+                index+1, match.end(), partial(join_indented, block)
+            )
+        else:
+            content = '\n'.join(block)
+        index = match.end()
+        if index < parser.end:
+            index = parser.text.find('\n', index+1, parser.end)
             if index == -1:
                 index = parser.end
-            line = parser.text[old_index:index]
-            if line[0:4] == 4*' ':
-                block.append(line[4:])
-            elif line[0:1] == '\t':
-                block.append(line[1:])
-            else:
-                index = index + 1
-                break
-        node.append_child(Text('\n'.join(block)))
+            index += 1
+        node.append_child(spans.new(Text, content))
         parser.update(index)
         return [node]
 
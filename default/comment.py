@@ -15,35 +15,46 @@ from lexor.core.writer import replace
 from lexor.core.elements import Comment
 
 
+def replace_dashes(content):
+    """Replace the double-hyphens in the content of a comment. """
+    return replace(content, ('--', '- '))
+
+
 class CommentNP(NodeParser):
     """Lexor comment parser. """
+    trigger = '<%'
 
     def _regular_comment(self, parser, caret):
         """Parse regular comments. """
-        if parser.text[caret+2:caret+4] != '--':
-            index = parser.text.find('!>', caret+2)
+        opaque = parser['OpaqueNP']
+        spans = parser['SpanNP']
+        if not parser.text.startswith('--', caret+2):
+            index = opaque.find('!>', caret+2)
             if index != -1:
                 parser.update(index+2)
-                content = replace(parser.text[caret+2:index], ('--', '- '))
-                return Comment(content)
-            index = parser.text.find('>', caret+2)
+                content = spans.span(caret+2, index, replace_dashes)
+                return spans.new(Comment, content)
+            index = opaque.find('>', caret+2)
             if index == -1:
                 self.msg('E100', parser.pos)
                 parser.update(parser.end)
-                content = parser.text[caret+2:parser.end]
-                return Comment(replace(content, ('--', '- ')))
+                content = spans.span(caret+2, parser.end, replace_dashes)
+                return spans.new(Comment, content)
             parser.update(index+1)
-            content = replace(parser.text[caret+2:index], ('--', '- '))
-            return Comment(content)
-        index = parser.text.find('--', caret+4)
+            content = spans.span(caret+2, index, replace_dashes)
+            return spans.new(Comment, content)
+        index = opaque.find('--', caret+4)
         if index == -1:
             self.msg('E200', parser.pos)
             parser.update(parser.end)
-            return Comment(parser.text[caret+4:parser.end])
+            return spans.new(Comment, spans.span(caret+4, parser.end))
+        if parser.text.startswith('-->', index):
+            parser.update(index+3)
+            return spans.new(Comment, spans.span(caret+4, index))
         content = parser.text[caret+4:index]
-        while parser.text[index:index+3] != '-->':
+        while not parser.text.startswith('-->', index):
             content += '- '
-            newindex = parser.text.find('--', index+1)
+            newindex = opaque.find('--', index+1)
             if newindex == -1:
                 content += parser.text[index+2:parser.end]
                 self.msg('E200', parser.pos)
@@ -56,23 +67,24 @@ class CommentNP(NodeParser):
 
     def _new_comment(self, parser, caret):
         """parse new style comment. """
-        index = parser.text.find('%%', caret+3)
+        spans = parser['SpanNP']
+        index = parser['OpaqueNP'].find('%%', caret+3)
         if index == -1:
             self.msg('E100', parser.pos)
             parser.update(parser.end)
-            return Comment(parser.text[caret+3:parser.end])
-        content = parser.text[caret+3:index]
+            return spans.new(Comment, spans.span(caret+3, parser.end))
         parser.update(index+3)
-        return Comment(replace(content, ('--', '- ')))
+        return spans.new(Comment, spans.span(caret+3, index, replace_dashes))
 
     def make_node(self):
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+2] == '<!':
+        angle = parser['AngleNP']
+        if angle.classify(caret)[0] != angle.COMMENT:
+            return None
+        if parser.text[caret] == '<':
             return self._regular_comment(parser, caret)
-        elif parser.text[caret:caret+3] == '%%!':
-            return self._new_comment(parser, caret)
-        return None
+        return self._new_comment(parser, caret)
 
 
 MSG = {
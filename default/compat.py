@@ -0,0 +1,68 @@
+"""LEXOR: COMPAT
+
+The node parsers of this style that change how the main parsing loop
+of `lexor.core.parser.Parser` runs use its private members only
+through this module:
+
+- `ScheduleNP` replaces `_close_node` and reads `_in_progress`.
+- `SpanNP` replaces `_process_text` and calls `_get_next_check`.
+
+These members are not part of the interface of lexor, so they are
+only used with the versions of lexor listed in `SUPPORTED`. The loop
+of those versions was checked against the replacements. With any
+other version the replacements are not installed, the parser runs
+its own loop and the documents it produces are the same.
+
+"""
+
+from lexor.__version__ import VERSION_INFO
+
+# The `(major, minor)` versions of lexor whose `Parser` has the
+# private members used in this module.
+SUPPORTED = [(0, 1)]
+
+
+def is_supported(version=None):
+    """Return True if the private members of `Parser` may be used
+    with the given version of lexor, by default the installed one. """
+    if version is None:
+        version = VERSION_INFO
+    return tuple(version[:2]) in SUPPORTED
+
+
+ENABLED = is_supported()
+
+
+def in_progress(parser):
+    """Return the list of `(node, node_parser)` pairs of the nodes
+    in progress, the innermost last. It is empty if the version of
+    lexor is not supported. """
+    if not ENABLED:
+        return ()
+    return parser._in_progress  # pylint: disable=W0212
+
+
+def next_check(parser, node):
+    """Return the index where a node parser may create a node inside
+    of `node`, -1 if there is none. """
+    return parser._get_next_check(node)  # pylint: disable=W0212
+
+
+def install_close_node(parser, close_node):
+    """Make `parser` call `close_node()` to close its nodes in
+    progress. Return False, leaving the parser untouched, if the
+    version of lexor is not supported. """
+    if not ENABLED:
+        return False
+    parser._close_node = close_node  # pylint: disable=W0212
+    return True
+
+
+def install_process_text(parser, process_text):
+    """Make `parser` call `process_text(crt)` to append the text
+    that no node parser claims. Return False, leaving the parser
+    untouched, if the version of lexor is not supported. """
+    if not ENABLED:
+        return False
+    parser._process_text = process_text  # pylint: disable=W0212
+    return True
@@ -1,6 +1,9 @@
 """LEXOR: DEFINE NodeParser
 
-Node parser description.
+Parses the macros declared in `%%{define}` blocks and keeps them in a
+table that expands their uses in a text. A macro declared with `=`
+is evaluated once, when it is declared, while a macro declared with
+`:=` is expanded every time it is used.
 
 """
 
@@ -10,10 +13,255 @@ from lexor.core.elements import Void
 from collections import OrderedDict
 
 RE = re.compile(r'\s+')
+BRACE_RE = re.compile(r'[{},]')
+
+
+class MacroTable(object):
+    """The macros of a document. A macro is used by writing its name
+    and, if it is a function, its arguments separated by commas
+    inside of braces:
+
+        table = MacroTable()
+        table.define('\\SET', 'set_delayed', r'\left\{:exp:\right\}',
+                     {'exp': ''})
+        table.expand(r'\SET{a, b}')
+
+    The bodies of the functions are compiled into templates once and
+    the result of expanding a call is remembered until a macro is
+    declared again. Macros declared with `=` are expanded with the
+    macros known at that point and their values are not expanded
+    again. """
+
+    def __init__(self):
+        self.macros = OrderedDict()
+        self._deps = dict()
+        self._bodies = dict()
+        self._pattern = None
+        self._memo = dict()
+
+    @classmethod
+    def collect(cls, node, report=None):
+        """Return the table of the `macro` nodes in the tree rooted at
+        `node`, see `define_nodes`. """
+        table = cls()
+        table.define_nodes(node, report)
+        return table
+
+    def define_nodes(self, node, report=None):
+        """Declare the macros of the `macro` nodes in the tree rooted
+        at `node`, in document order. If `report` is given it is
+        called with the node and the cycle of every macro that is
+        defined in terms of itself. """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.name == 'macro' and 'name' in node:
+                cycle = self.define(
+                    node['name'], node['flag'], node['value'],
+                    node['arg'] if 'arg' in node else None
+                )
+                if cycle and report is not None:
+                    report(node, cycle)
+            if node.child:
+                stack.extend(reversed(node.child))
+
+    def define(self, name, flag, value, arg=None):
+        """Declare a macro. `arg` maps the parameters of a function to
+        their default values. Return None or, if the macro would be
+        defined in terms of itself, the names of the macros in the
+        cycle, in which case the macro is not declared. """
+        params = [param.strip() for param in arg] if arg else list()
+        if flag == 'set':
+            value = self.expand(value)
+            deps = set()
+        else:
+            deps = self._uses(value, self.macros.keys() + [name])
+        users = set(
+            other for other, body in self._bodies.items()
+            if other != name and self._uses(body, [name])
+        )
+        cycle = self._find_cycle(name, deps, users)
+        if cycle:
+            return cycle
+        self.macros[name] = (flag, compile_template(value, params), arg)
+        self._deps[name] = deps
+        self._bodies.pop(name, None)
+        if flag != 'set':
+            self._bodies[name] = value
+        for other in users:
+            self._deps[other].add(name)
+        self._pattern = None
+        self._memo.clear()
+        return None
+
+    @staticmethod
+    def _uses(text, names):
+        """The macros in `names` that are used in `text`. """
+        pattern = _names_pattern(names)
+        return set(match.group(0) for match in pattern.finditer(text))
+
+    def _find_cycle(self, name, deps, users):
+        """Return the path from `name` back to itself through the
+        dependencies of the macros or None. The macros in `users`
+        depend on `name`. """
+        stack = [(dep, [name, dep]) for dep in deps]
+        seen = set()
+        while stack:
+            dep, path = stack.pop()
+            if dep == name:
+                return path
+            if dep in seen:
+                continue
+            seen.add(dep)
+            if dep in users:
+                stack.append((name, path + [name]))
+            for item in self._deps.get(dep, ()):
+                stack.append((item, path + [item]))
+        return None
+
+    def expand(self, text):
+        """Return `text` with the macros replaced by their values. """
+        if not self.macros:
+            return text
+        if text in self._memo:
+            return self._memo[text]
+        if self._pattern is None:
+            self._pattern = _names_pattern(self.macros)
+        result = list()
+        caret = 0
+        for match in self._pattern.finditer(text):
+            if match.start() < caret:
+                continue
+            name = match.group(0)
+            flag, template, arg = self.macros[name]
+            end = match.end()
+            args = ()
+            if arg is not None:
+                args, end = split_arguments(text, end, len(arg))
+                if args is None:
+                    continue
+                args = tuple(self.expand(item) for item in args)
+            result.append(text[caret:match.start()])
+            result.append(self._call(name, args))
+            caret = end
+        result.append(text[caret:])
+        result = ''.join(result)
+        self._memo[text] = result
+        return result
+
+    def _call(self, name, args):
+        """Return the value of a use of the macro `name`. """
+        key = (name, args)
+        if key not in self._memo:
+            flag, template, arg = self.macros[name]
+            values = list(args)
+            if arg is not None:
+                defaults = list(arg.values())
+                values = [
+                    value if value else default
+                    for value, default in zip(values, defaults)
+                ]
+                values.extend(defaults[len(values):])
+            value = render_template(template, values)
+            if flag != 'set':
+                value = self.expand(value)
+            self._memo[key] = value
+        return self._memo[key]
+
+
+def _names_pattern(names):
+    """Regular expression matching the uses of the macros in
+    `names`, the longest names first. """
+    items = list()
+    for name in sorted(names, key=lambda item: (-len(item), item)):
+        item = re.escape(name)
+        if re.match(r'\w', name):
+            item = r'(?<![\w\\])' + item
+        if re.search(r'\w$', name):
+            item += r'(?!\w)'
+        items.append(item)
+    return re.compile('|'.join(items))
+
+
+def compile_template(body, params):
+    """Split `body` into a list alternating the text between the
+    parameters `:name:` and the indices of the parameters. """
+    names = [re.escape(param) for param in params if param]
+    if not names:
+        return [body]
+    pattern = re.compile(':(%s):' % '|'.join(names))
+    template = list()
+    caret = 0
+    for match in pattern.finditer(body):
+        template.append(body[caret:match.start()])
+        template.append(params.index(match.group(1)))
+        caret = match.end()
+    template.append(body[caret:])
+    return template
+
+
+def render_template(template, values):
+    """Replace the parameters of a compiled template by `values`. """
+    if len(template) == 1:
+        return template[0]
+    return ''.join(
+        item if num % 2 == 0 else values[item]
+        for num, item in enumerate(template)
+    )
+
+
+def split_arguments(text, index, count=None):
+    """Return the arguments inside the braces starting at `index` and
+    the index after the closing brace, or `(None, index)` if there
+    are no balanced braces. The arguments are separated by the commas
+    that are not inside nested braces. If `count` is given then at
+    most `count` arguments are returned, the commas after the first
+    `count - 1` are part of the last argument. """
+    if text[index:index+1] != '{':
+        return None, index
+    args = list()
+    level = 0
+    start = index + 1
+    for match in BRACE_RE.finditer(text, index):
+        char = match.group(0)
+        if char == '{':
+            level += 1
+        elif char == '}':
+            level -= 1
+            if level == 0:
+                args.append(text[start:match.start()].strip())
+                return args, match.end()
+        elif level == 1 and (count is None or len(args) < count - 1):
+            args.append(text[start:match.start()].strip())
+            start = match.end()
+    return None, index
 
 
 class MacroNP(NodeParser):
-    """Parse elements inside the define block. """
+    """Parse elements inside the define block. The macros of the
+    document are declared in `table` by `collect` once the whole
+    document has been parsed, the `macro` nodes keep the position of
+    their declaration for the messages issued then. A macro may be
+    used before the block that declares it, and a parser may reuse
+    the nodes of a block without parsing it again. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.table = MacroTable()
+
+    def collect(self, report=True):
+        """Declare the macros of the document in a new `table`. The
+        macros defined in terms of themselves are reported unless
+        `report` is False. """
+        self.table = MacroTable.collect(
+            self.parser.doc, self.report if report else None
+        )
+
+    def report(self, node, cycle):
+        """Report that the macro of `node` is defined in terms of
+        itself through the macros in `cycle`. """
+        self.msg('E102', [node.line, node.column],
+                 [node['name'], ' -> '.join(cycle)])
 
     def get_function(self, pos, exp):
         """Obtain the function name. """
@@ -35,7 +283,7 @@ class MacroNP(NodeParser):
 
     def make_node(self):
         parser = self.parser
-        if parser.text[parser.caret:parser.caret+3] == '\n%%':
+        if parser.text.startswith('\n%%', parser.caret):
             return None
         index = parser.text.find('\n', parser.caret+1)
         while index != -1:
@@ -47,7 +295,7 @@ class MacroNP(NodeParser):
             parser.update(parser.caret+1)
             return None
 
-        pos = parser.compute(parser.caret+1)
+        pos = parser['LineNP'].position(parser.caret+1)
         content = parser.text[parser.caret:index].strip()
         parser.update(index)
 
@@ -72,17 +320,21 @@ class MacroNP(NodeParser):
         value = re.sub(RE, ' ', value.strip().replace('\\\n', ''))
 
         node = Void('macro')
+        node.set_position(*pos)
         node['flag'] = flag
         node['name'] = name
         node['value'] = value
         if name[0] == '\\':
             node['arg'] = arg
+        else:
+            arg = None
         return node
 
 
 MSG = {
     'E100': 'no `=` or `:=` found in macro declaration',
     'E101': 'missing `{0}` in macro function definition',
+    'E102': 'macro `{0}` is defined in terms of itself: {1}',
 }
 MSG_EXPLANATION = [
     r"""
@@ -94,6 +346,10 @@ MSG_EXPLANATION = [
       `exp` is a paramter then you may use `:exp:` to refer to it
       inside the function definition.
 
+    - A macro defined with `:=` is expanded every time it is used,
+      it cannot be defined in terms of itself, even through other
+      macros.
+
     Okay:
         %%{define}
         x = 100
@@ -110,5 +366,10 @@ MSG_EXPLANATION = [
         x = 100
         \\SET := \left\{:exp:\right\}
         %%
+    E102:
+        %%{define}
+        a := b + 1
+        b := a + 1
+        %%
 """,
 ]
@@ -0,0 +1,79 @@
+"""LEXOR: DISPATCH NodeParser
+
+Instead of trying every node parser of a context at every character
+that may start a node, the node parsers may declare the characters
+they are able to start on. This module provides the node parser that
+uses that information to call only the node parsers that have a
+chance of returning a node.
+
+"""
+
+from lexor.core.parser import NodeParser
+
+
+class DispatchNP(NodeParser):
+    """Calls the `make_node` method of the node parsers that may
+    start a node with the character at the caret. A node parser
+    declares these characters with the class attribute `trigger`:
+
+        class CodeInlineNP(NodeParser):
+            trigger = '`'
+
+    Node parsers that do not define `trigger` are tried at every
+    character. Within each character the node parsers are tried in
+    the order given to `build`. The `close` method of the node
+    parser that created a node, see `owner`, is the one that closes
+    it. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.table = dict()
+        self.default = list()
+        self._text = None
+        self._owner = dict()
+
+    def build(self, names):
+        """Create the dispatch table from a list of node parser names
+        given in order of priority. """
+        table = dict()
+        default = list()
+        for name in names:
+            nodeparser = self.parser[name]
+            trigger = getattr(nodeparser, 'trigger', None)
+            if trigger is None:
+                default.append(nodeparser)
+                for bucket in table.values():
+                    bucket.append(nodeparser)
+                continue
+            for char in trigger:
+                if char not in table:
+                    table[char] = list(default)
+                table[char].append(nodeparser)
+        self.table = table
+        self.default = default
+
+    def make_node(self):
+        parser = self.parser
+        if self._text is not parser.text:
+            self._text = parser.text
+            self._owner.clear()
+        char = parser.text[parser.caret]
+        for nodeparser in self.table.get(char, self.default):
+            node = nodeparser.make_node()
+            if node is not None:
+                if isinstance(getattr(node, 'child', None), list):
+                    self._owner[id(node)] = nodeparser
+                return node
+            elif parser.caret == parser.end:
+                break
+        return None
+
+    def owner(self, node):
+        """Return the node parser that created `node`. """
+        return self._owner[id(node)]
+
+    def close(self, node):
+        pos = self._owner[id(node)].close(node)
+        if pos is not None:
+            del self._owner[id(node)]
+        return pos
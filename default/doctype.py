@@ -23,13 +23,11 @@ from lexor.core.elements import DocumentType
 
 class DocumentTypeNP(NodeParser):
     """Reads the doctype tag. """
+    trigger = '<%'
 
     def _regular_doctype(self, parser, caret):
         """Parse regular doctype. """
-        char = parser.text[caret+9:caret+10]
-        if char not in ' \t\n\r\f\v':
-            return None
-        index = parser.text.find('>', caret+10)
+        index = parser['OpaqueNP'].find('>', caret+10)
         if index == -1:
             self.msg('E100', parser.pos, ['>'])
             parser.update(parser.end)
@@ -39,10 +37,7 @@ class DocumentTypeNP(NodeParser):
 
     def _new_doctype(self, parser, caret):
         """Parse new doctype. """
-        char = parser.text[caret+10:caret+11]
-        if char not in ' \t\n\r\f\v':
-            return None
-        index = parser.text.find('%%', caret+11)
+        index = parser['OpaqueNP'].find('%%', caret+11)
         if index == -1:
             self.msg('E100', parser.pos, ['%%'])
             parser.update(parser.end)
@@ -54,11 +49,12 @@ class DocumentTypeNP(NodeParser):
         """Returns a DocumentType node. """
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+9].lower() == '<!doctype':
+        angle = parser['AngleNP']
+        if angle.classify(caret)[0] != angle.DOCTYPE:
+            return None
+        if parser.text[caret] == '<':
             return self._regular_doctype(parser, caret)
-        if parser.text[caret:caret+10].lower() == '%%!doctype':
-            return self._new_doctype(parser, caret)
-        return None
+        return self._new_doctype(parser, caret)
 
 
 MSG = {
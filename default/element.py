@@ -14,12 +14,21 @@ If no tagname is given then it the name of the element defaults to
 """
 
 import re
+from array import array
+from bisect import bisect_left
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Element, Void, RawText
 
 RE = re.compile(r'.*?[ \t\n\r\f\v/>}]')
-RE_NOSPACE = re.compile(r"\s*")
-RE_NEXT = re.compile(r'.*?[ \t\n\r\f\v/>=]')
+RE_TOKEN = re.compile(r'%%\{|[<>}]')
+RE_TAGNAME = re.compile(r'[^ \t\n\r\f\v/>}]*')
+# One attribute of an opening tag: a property followed by an optional
+# value, or one of the characters that end the list of attributes.
+ATTRIBUTE_RE = re.compile(
+    r'(?P<space>\s*)(?:(?P<stop>[/>}])|(?P<prop>[^\s/>=}][^\s/>=]*|)'
+    r'(?:(?P<assign>(?:[\s>]\s*)?=)\s*(?:(?P<vstop>[/>}])|'
+    r'(?P<quoted>"[^"]*"?|\'[^\']*\'?)|(?P<value>[^\s/>}]+))?|>(?=\s))?)'
+)
 VOID_ELEMENT = (
     'area', 'base', 'basefont', 'br', 'col', 'frame', 'hr', 'img',
     'input', 'isindex', 'link', 'meta', 'param', 'command', 'embed',
@@ -91,71 +100,143 @@ class ElementNP(NodeParser):
     The rules of HTML apply here. For instance if you write a "p" tag
     it and we encounter another "p" tag before its closing tag then
     the first p tag will be closed."""
+    trigger = '<%'
+    closes_on = '<%'
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._tags = None
+        self._lt = None
+        self._gt = None
+        self._rb = None
+
+    def index_tags(self):
+        """Scan the document once and record every opening tag. The
+        record of a tag starting at a given offset is a tuple
+
+            (endindex, shift, start, tagname)
+
+        where `endindex` is the index where the opening tag ends,
+        `shift` is 1 (if element starts with '<') or 3 (if it starts
+        with '%%{'), `start` is the index of a `<` found inside the
+        opening tag (in which case the element is discarded and
+        `tagname` is None) and `tagname` is the tagname as written
+        in the text. """
+        text = self.parser.text
+        self._text = text
+        self._tags = dict()
+        self._lt, self._gt, self._rb = array('l'), array('l'), array('l')
+        offsets = {'<': self._lt, '>': self._gt, '}': self._rb}
+        candidates = []
+        for match in RE_TOKEN.finditer(text):
+            index = match.start()
+            char = text[index]
+            if char == '%':
+                candidates.append(index)
+                continue
+            if char == '<':
+                candidates.append(index)
+            offsets[char].append(index)
+        for caret in candidates:
+            self._index_tag(text, caret)
+
+    def _index_tag(self, text, caret):
+        """Helper function for index_tags. """
+        search = False
+        if text[caret] == '<':
+            shift = 1
+        else:
+            shift = 3
+            if text[caret+3:caret+4] == '}':
+                self._tags[caret] = (caret+4, shift, None, '')
+                return
+            if text[caret+3:caret+4] in '.#@[':
+                search = True
+        char = text[caret+shift:caret+shift+1]
+        if not (search or char.isalpha() or char in [":", "_"]):
+            return
+        ends = self._gt if shift == 1 else self._rb
+        num = bisect_left(ends, caret+shift)
+        if num == len(ends):
+            return
+        endindex = ends[num]
+        num = bisect_left(self._lt, caret+1)
+        if num < len(self._lt) and self._lt[num] < endindex:
+            self._tags[caret] = (endindex, shift, self._lt[num], None)
+            return
+        tagname = RE_TAGNAME.match(text, caret+shift).group()
+        self._tags[caret] = (endindex, shift, None, tagname)
+
+    def get_tag(self, index):
+        """Return the record of the opening tag starting at `index`
+        (see `index_tags`) or None if there is no tag there. """
+        if self._text is not self.parser.text:
+            self.index_tags()
+        return self._tags.get(index)
+
+    def open_tag(self, end):
+        """Return the offset of the first opening tag that ends at or
+        after `end`, or None if there is no such tag. """
+        if self._text is not self.parser.text:
+            self.index_tags()
+        found = [
+            caret for caret, tag in self._tags.iteritems() if tag[0] >= end
+        ]
+        return min(found) if found else None
+
+    def find_gt(self, begin, end):
+        """Same as `parser.text.find('>', begin, end)` but it uses the
+        offsets recorded by `index_tags`. """
+        if self._text is not self.parser.text:
+            self.index_tags()
+        num = bisect_left(self._gt, begin)
+        if num == len(self._gt) or self._gt[num] >= end:
+            return -1
+        return self._gt[num]
 
     def is_element(self, parser):
         """Check to see if the parser's caret is positioned in an
         element and return the index where the opening tag ends and
         the number 1 (if element starts with '<') or 3 (if it starts
         with '%%{'). """
-        caret = parser.caret
-        search = False
-        if parser.text[caret:caret+1] == '<':
-            shift = 1
-        elif parser.text[caret:caret+3] == '%%{':
-            shift = 3
-            if parser.text[caret+3:caret+4] == '}':
-                return [caret+4, shift]
-            if parser.text[caret+3:caret+4] in '.#@[':
-                search = True
-        else:
+        if self._text is not parser.text:
+            self.index_tags()
+        tag = self._tags.get(parser.caret)
+        if tag is None:
             return None
-        char = parser.text[caret+shift:caret+shift+1]
-        if search or char.isalpha() or char in [":", "_"]:
-            endindex = parser.text.find(END_CHAR[shift], caret+shift)
-            if endindex == -1:
-                return None
-            start = parser.text.find('<', caret+1)
-            if start != -1 and start < endindex:
-                self.msg('E100', parser.pos, parser.compute(start))
-                return None
-        else:
+        if tag[2] is not None:
+            pos = parser['LineNP'].position(tag[2])
+            self.msg('E100', parser.pos, pos)
             return None
-        return [endindex, shift]
+        return [tag[0], tag[1]]
 
     def get_tagname(self, parser):
         """If the parser is positioned at an element it will return
         the tagname, otherwise it returns None. """
-        caret = parser.caret
-        tmp = self.is_element(parser)
-        if tmp is None:
+        if self.is_element(parser) is None:
             return None
-        shift = tmp[1]
-        match = RE.search(parser.text, caret+shift)
-        tagname = parser.text[parser.caret+shift:match.end(0)-1]
+        tagname = self._tags[parser.caret][3]
         if tagname == '' or tagname[0] in '.#[@':
             tagname = 'span'
         return tagname.lower()
 
     def get_raw_text(self, parser, tagname, pos, shift):
-        """Return the data content of the RawText object and update
-        the caret. """
+        """Return the data content of the RawText object, a span of
+        the text (see `SpanNP`), and update the caret. """
+        opaque = parser['OpaqueNP']
         if shift == 3:
             start, end = '%%{', '%%'
-            index = parser.text.find('%%', parser.caret)
+            index = opaque.find('%%', parser.caret)
         else:
             start, end = '<', ('</%s>' % tagname)
-            index = parser.text.find('<', parser.caret)
-            while index != -1:
-                tmpstr = parser.text[index:index+len(tagname)+3].lower()
-                if tmpstr == end:
-                    break
-                index = parser.text.find('<', index+1)
+            index = opaque.find(end, parser.caret, fold=True)
         if index == -1:
             self.msg('E110', pos, [start, tagname, end])
-            content = parser.text[parser.caret:]
+            content = parser['SpanNP'].span(parser.caret, parser.end)
             parser.update(parser.end)
         else:
-            content = parser.text[parser.caret:index]
+            content = parser['SpanNP'].span(parser.caret, index)
             parser.update(index+len(end))
         return content
 
@@ -165,27 +246,29 @@ class ElementNP(NodeParser):
         the node is not yet done and that further checks need to be
         performed. """
         flag = None
-        if node.type__ == 1:
+        shift = parser['StackNP'].data(node)
+        if shift == 1:
             if parser.text[caret:caret+1] != '<':
                 pass
             elif parser.text[caret+1:caret+2] == '/':
-                index = parser.text.find('>', caret+2)
+                index = self.find_gt(caret+2, parser.end)
                 if index == -1:
                     return None
-                tmptag = parser.text[caret+2:index].lower()
-                if node.name == tmptag:
+                opaque = parser['OpaqueNP']
+                if (index == caret+2+len(node.name) and
+                        opaque.startswith('</' + node.name, caret)):
                     pos = parser.copy_pos()
                     parser.update(index+1)
                     return pos
             else:
                 flag = self.is_element(parser)
-        elif node.type__ == 3:
-            if parser.text[caret:caret+3] in ['%%?', '%%!']:
+        elif shift == 3:
+            if parser.text.startswith(('%%?', '%%!'), caret):
                 return None
             flag = self.is_element(parser)
             if flag:
                 pass
-            elif parser.text[caret:caret+2] == '%%':
+            elif parser.text.startswith('%%', caret):
                 pos = parser.copy_pos()
                 parser.update(caret+2)
                 return pos
@@ -203,17 +286,17 @@ class ElementNP(NodeParser):
         endindex = tmp[0]
         shift = tmp[1]
         pos = parser.copy_pos()
-        match = RE.search(parser.text, caret+shift)
-        tagname = parser.text[parser.caret+shift:match.end(0)-1].lower()
+        tagname = self._tags[caret][3]
         if tagname == '' or tagname[0] in '.#!@':
             tagname = 'span'
             parser.update(caret+3)
         else:
-            parser.update(match.end(0)-1)
+            parser.update(caret+shift+len(tagname))
+            tagname = tagname.lower()
         if tagname in VOID_ELEMENT:
             node = Void(tagname)
         elif tagname in RAWTEXT_ELEMENT:
-            node = RawText(tagname)
+            node = parser['SpanNP'].new(RawText, tagname)
         else:
             node = Element(tagname)
         if parser.text[parser.caret] == END_CHAR[shift]:
@@ -228,27 +311,30 @@ class ElementNP(NodeParser):
             node.data = self.get_raw_text(parser, tagname, pos, shift)
             return [node]
         node.pos = pos
-        node.type__ = shift
+        parser['StackNP'].push(node, -1, shift)
         return node
 
     def close(self, node):
         """Returns the position where the element was closed. """
         parser = self.parser
         caret = parser.caret
+        stack = parser['StackNP']
         done = self.is_done(node, parser, caret)
-        if isinstance(done, list):
-            del node.type__
-            return done
         if done is None:
             return done
+        if done is not False:
+            stack.pop(node)
+            return done
         # http://www.whatwg.org/specs/web-apps/current-work/#optional-tags
-        match = RE.search(parser.text, caret+node.type__)
-        if parser.text[parser.caret] == '<':
-            tmptag = parser.text[parser.caret+1:match.end(0)-1].lower()
+        tag = self._tags.get(caret)
+        if tag is not None and tag[1] == stack.data(node):
+            tmptag = tag[3].lower()
         else:
-            tmptag = parser.text[parser.caret+3:match.end(0)-1].lower()
+            shift = 1 if parser.text[caret] == '<' else 3
+            match = RE.search(parser.text, caret+stack.data(node))
+            tmptag = parser.text[caret+shift:match.end(0)-1].lower()
         if node.name in AUTO_CLOSE and tmptag in AUTO_CLOSE[node.name]:
-            del node.type__
+            stack.pop(node)
             return parser.copy_pos()
         if node.name in AUTO_CLOSE_FIRST:
             has_element = False
@@ -257,93 +343,10 @@ class ElementNP(NodeParser):
                     has_element = True
                     break
             if has_element is False and tmptag in AUTO_CLOSE_FIRST[node.name]:
-                del node.type__
+                stack.pop(node)
                 return parser.copy_pos()
         return None
 
-    def is_empty(self, parser, index, end, tagname):
-        """Checks to see if the parser has reached '/'. """
-        if parser.text[index] == '/':
-            parser.update(end+1)
-            if end - index > 1:
-                self.msg('E120', parser.compute(index))
-            if tagname not in VOID_ELEMENT:
-                self.msg('E121', parser.compute(index))
-            return True
-        return False
-
-    def read_prop(self, parser, node, end, attlen):
-        """Return [prop, prop_index, implied, empty]. """
-        prop = None
-        prop_index = None
-        match = RE_NOSPACE.search(parser.text, parser.caret, end)
-        if self.is_empty(parser, match.end(0), end, node.name):
-            return prop, prop_index, False, True
-        if parser.text[match.end(0)] in '>}':
-            parser.update(end+1)
-            return prop, prop_index, False, False
-        prop_index = match.end(0)
-        if prop_index - parser.caret == 0 and node.attlen > attlen:
-            self.msg('E130', parser.pos)
-        match = RE_NEXT.search(parser.text, prop_index, end)
-        if match is None:
-            prop = parser.text[prop_index:end]
-            parser.update(end+1)
-            return prop, prop_index, True, False
-        prop = parser.text[prop_index:match.end(0)-1]
-        if self.is_empty(parser, match.end(0)-1, end, node.name):
-            return prop, prop_index, True, True
-        if parser.text[match.end(0)-1] == '=':
-            parser.update(match.end(0))
-            return prop, prop_index, False, False
-        match = RE_NOSPACE.search(parser.text, match.end(0), end)
-        if parser.text[match.end(0)] == '=':
-            implied = False
-            parser.update(match.end(0)+1)
-        else:
-            implied = True
-            parser.update(match.end(0)-1)
-        return prop, prop_index, implied, False
-
-    def read_val(self, parser, end, tagname):
-        """Returns the attribute value. """
-        match = RE_NOSPACE.search(parser.text, parser.caret, end)
-        if self.is_empty(parser, match.end(0), end, tagname):
-            return ''
-        if parser.text[match.end(0)] in '>}':
-            parser.update(end+1)
-            return ''
-        val_index = match.end(0)
-        if parser.text[val_index] in ["'", '"']:
-            quote = parser.text[val_index]
-            index = parser.text.find(quote, val_index+1, end)
-            if index == -1:
-                self.msg('E150', parser.pos, parser.compute(end))
-                parser.update(end+1)
-                return parser.text[val_index+1:end]
-            parser.update(index+1)
-            return parser.text[val_index+1:index]
-        else:
-            pos = parser.copy_pos()
-            match = RE.search(parser.text, val_index, end)
-            if match is None:
-                val = parser.text[val_index:end]
-                for item in '\'"=':
-                    if item in val:
-                        self.msg('E140', pos, [item])
-                parser.update(end+1)
-                return val
-            if parser.text[match.end(0)-1] == '/':
-                self.msg('E141', pos)
-                parser.update(match.end(0)-1)
-            else:
-                parser.update(match.end(0)-1)
-            val = parser.text[val_index:match.end(0)-1]
-            for item in '\'"=':
-                if item in val:
-                    self.msg('E140', pos, [item])
-            return val
-
     #pylint: disable=R0913
     def handle_id_ref(self, parser, node, prop, prop_index, prop_type):
         """Handle the ID and Python references. """
@@ -354,16 +357,16 @@ class ElementNP(NodeParser):
             '@': '#',
         }
         if len(prop) == 1:
-            self.msg(
-                'E170', parser.compute(prop_index), [mapping[prop_type]]
-            )
+            pos = parser['LineNP'].position(prop_index)
+            self.msg('E170', pos, [mapping[prop_type]])
         elif prop[-1] == mapping[prop[0]]:
             val = prop[1:-1]
             if len(val) > 0:
                 node['_pyref'] = val
                 node['id'] = val
             else:
-                self.msg('E171', parser.compute(prop_index))
+                pos = parser['LineNP'].position(prop_index)
+                self.msg('E171', pos)
         else:
             node[prop_type] = prop[1:]
 
@@ -394,9 +397,8 @@ class ElementNP(NodeParser):
         elif prop[0] == '#':
             self.handle_id_ref(parser, node, prop, prop_index, 'id')
         elif prop == 'id':
-            self.msg(
-                'E170', parser.compute(prop_index), ['element IDs']
-            )
+            pos = parser['LineNP'].position(prop_index)
+            self.msg('E170', pos, ['element IDs'])
         elif prop[0] == '.':
             if 'class' in node:
                 node['class'] += ' %s' % prop[1:]
@@ -404,13 +406,51 @@ class ElementNP(NodeParser):
                 node['class'] = prop[1:]
         elif prop[0] == '[' and prop[-1] == ']':
             val = prop[1:-1].lower()
+            pos = parser['LineNP'].position(prop_index)
             if '_alref' in node:
-                node['_alref'].append((parser.compute(prop_index), val))
+                node['_alref'].append((pos, val))
             else:
-                node['_alref'] = [(parser.compute(prop_index), val)]
+                node['_alref'] = [(pos, val)]
         else:
             node[prop] = ""
 
+    def is_empty(self, index, end, tagname):
+        """Report the `/` found at `index` while reading the attributes
+        of an element whose opening tag ends at `end`. """
+        pos = self.parser['LineNP'].position(index)
+        if end - index > 1:
+            self.msg('E120', pos)
+        if tagname not in VOID_ELEMENT:
+            self.msg('E121', pos)
+
+    def read_val(self, parser, match, end, tagname):
+        """Return the value of the attribute matched by
+        `ATTRIBUTE_RE` and a boolean telling if the value is the last
+        one of the attribute list. The position reported in the
+        messages is the one of the caret, right after the `=`. """
+        quoted = match.group('quoted')
+        if quoted is not None:
+            if len(quoted) > 1 and quoted[-1] == quoted[0]:
+                return quoted[1:-1], False
+            parser.update(match.end('assign'))
+            pos = parser['LineNP'].position(end)
+            self.msg('E150', parser.pos, pos)
+            return quoted[1:], True
+        val = match.group('value')
+        if val is None:
+            if match.group('vstop') == '/':
+                self.is_empty(match.start('vstop'), end, tagname)
+            return '', True
+        last = match.end('value') == end
+        if not last and parser.text[match.end('value')] == '/':
+            parser.update(match.end('assign'))
+            self.msg('E141', parser.pos)
+        for item in '\'"=':
+            if item in val:
+                parser.update(match.end('assign'))
+                self.msg('E140', parser.pos, [item])
+        return val, last
+
     def read_attributes(self, parser, node, end, skip=1):
         """Parses the string
 
@@ -420,27 +460,52 @@ class ElementNP(NodeParser):
 
             att1="val1" att2="val2" ...
 
-        This function returns True if the opening tag ends with `/`.
+        Each attribute is a match of `ATTRIBUTE_RE`, the matches are
+        consecutive so the list is read in one pass. This function
+        returns True if the opening tag ends with `/`.
         """
         attlen = node.attlen
-        while parser.caret < end:
-            prop, prop_index, implied, empty = self.read_prop(
-                parser, node, end, attlen
-            )
-            if prop is None or prop == '':
-                parser.update(end+skip)
-                return empty
+        caret = parser.caret
+        empty = None
+        matches = ATTRIBUTE_RE.finditer(parser.text, caret, end)
+        while caret < end:
+            match = next(matches)
+            index = match.end('space')
+            stop = match.group('stop')
+            if stop is not None:
+                if stop == '/':
+                    self.is_empty(index, end, node.name)
+                caret, empty = end+1, stop == '/'
+                break
+            if index == caret and node.attlen > attlen:
+                parser.update(caret)
+                self.msg('E130', parser.pos)
+            prop = match.group('prop')
+            if prop == '':
+                caret, empty = index+1, False
+                break
+            last = False
+            prop_end = match.end('prop')
+            if match.group('assign') is None:
+                if prop_end == end:
+                    last = True
+                elif parser.text[prop_end] == '/':
+                    self.is_empty(prop_end, end, node.name)
+                    last = empty = True
             if prop in node:
-                self.msg('E160', parser.compute(prop_index), [prop])
-            if implied is True:
-                self.prop_shortcut(parser, node, prop, prop_index)
-                if empty is True:
-                    parser.update(end+skip)
-                    return empty
+                pos = parser['LineNP'].position(index)
+                self.msg('E160', pos, [prop])
+            if match.group('assign') is None:
+                self.prop_shortcut(parser, node, prop, index)
             else:
-                val = self.read_val(parser, end, node.name)
-                node[prop] = val
+                node[prop], last = self.read_val(parser, match, end, node.name)
+            if last:
+                caret = end+1
+                break
+            caret = match.end()
+        parser.update(caret)
         parser.update(end+skip)
+        return empty
 
     def get_attribute_list(self, parser, node, start='{', end='}'):
         """Attempts to get the attribute list at the current position
@@ -15,6 +15,7 @@ RE = re.compile('.*?[ \t\n\r\f\v;]')
 class EntityNP(NodeParser):
     """Processes special characters. This parser should be called
     only after all the other processors have attempted to parse."""
+    trigger = '&<\\'
     escape = '<`*_[]()+-.!:'
     tex = '\\{}$&#^_%~'
 
@@ -33,19 +34,15 @@ class EntityNP(NodeParser):
 
     def _handle_lt(self, parser, caret):
         """Helper function for make_node. """
-        if parser.text[caret+1:caret+2] == '/':
-            tmp = parser.text.find('>', caret+2)
-            if tmp == -1:
-                parser.update(caret+1)
-                return Entity('<')
-            else:
-                stray_endtag = parser.text[caret:tmp+1]
-                self.msg('E100', parser.pos, [stray_endtag])
-                parser.update(tmp+1)
-                return Text('')
-        else:
-            parser.update(caret+1)
-            return Entity('<')
+        angle = parser['AngleNP']
+        kind, tmp = angle.classify(caret)
+        if kind == angle.END_TAG and -1 < tmp < parser['LineNP'].window():
+            stray_endtag = parser.text[caret:tmp+1]
+            self.msg('E100', parser.pos, [stray_endtag])
+            parser.update(tmp+1)
+            return Text('')
+        parser.update(caret+1)
+        return Entity('<')
 
     def _handle_escape(self, parser, caret):
         """Helper function for make_node. """
@@ -57,7 +54,7 @@ class EntityNP(NodeParser):
         if char in self.tex:
             node = Entity('\\%s' % char)
             parser.update(caret+2)
-        elif parser.text[caret:caret+10] == '\\backslash':
+        elif parser.text.startswith('\\backslash', caret):
             node = Entity('\\backslash')
             parser.update(caret+10)
         elif char in self.escape:
@@ -82,11 +79,12 @@ class EntityNP(NodeParser):
 
 class BreakNP(NodeParser):
     """Obtains the line break. """
+    trigger = '\\'
 
     def make_node(self):
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+2] == '\\\\':
+        if parser.text.startswith('\\\\', caret):
             parser.update(parser.caret+2)
             return Void('br')
         return None
@@ -4,10 +4,8 @@ Lexor supports two types of headers: setext and atx.
 
 """
 
-import re
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Element
-SETEXT_RE = re.compile(r'^.*?\n[=-]+[ ]*(\n|$)', re.MULTILINE)
 
 
 class AtxHeaderNP(NodeParser):
@@ -60,40 +58,48 @@ class AtxHeaderNP(NodeParser):
             index -= 1
         if parser.text[index+1:index+2] == '#':
             content_end = index+1
-        node.content_end = content_end
-        node.att = att
-        node.left_b = left_b
-        node.final_pos = final_pos
+        parser['StackNP'].push(node, content_end, (att, left_b, final_pos))
+        parser['LineNP'].open_block(node, self)
         return node
 
+    def block_end(self, node):
+        """The content of the header ends before its attributes or
+        the end of its line. """
+        return self.parser['StackNP'].end(node)
+
+    def close_at(self, node):
+        """The node closes where its content ends. """
+        return self.parser['StackNP'].end(node)
+
     def close(self, node):
+        """Returns the position where the element was closed. """
         parser = self.parser
         caret = parser.caret
-        if node.content_end != caret:
+        stack = parser['StackNP']
+        if stack.end(node) != caret:
             return None
+        att, left_b, final_pos = stack.data(node)
+        stack.pop(node)
         pos = parser.copy_pos()
-        if node.att is True:
-            parser.update(node.left_b)
+        if att is True:
+            parser.update(left_b)
             parser['ElementNP'].get_attribute_list(parser, node)
-        parser.update(node.final_pos)
+        parser.update(final_pos)
         parser['ElementNP'].get_attribute_list(parser, node)
-        del node.att
-        del node.left_b
-        del node.content_end
-        del node.final_pos
         return pos
 
 
-class SetextHeaderNP(NodeParser):
+class SetextHeaderNP(AtxHeaderNP):
     """Parses header elements. """
 
     def make_node(self):
         """Returns a header element."""
         parser = self.parser
-        match = SETEXT_RE.match(parser.text, parser.caret, parser.end)
-        if match is None:
+        lines = parser['LineNP']
+        num = lines.line_at(parser.caret)
+        if num is None or not lines.is_kind(num+1, lines.SETEXT):
             return None
-        index = parser.text.find('\n', parser.caret, parser.end)
+        index = lines.start(num+1) - 1
 
         level = 1
         if parser.text[index+1] == '-':
@@ -102,7 +108,7 @@ class SetextHeaderNP(NodeParser):
         node.pos = parser.copy_pos()
 
         content_start = parser['EmptyNP'].skip_space(parser)
-        final_pos = match.end(0)
+        final_pos = lines.end(num+1)
         att = False
         left_b = None
         right_b = parser.text.rfind('}', content_start, index)
@@ -117,26 +123,6 @@ class SetextHeaderNP(NodeParser):
         else:
             content_end = index
 
-        node.content_end = content_end
-        node.att = att
-        node.left_b = left_b
-        node.final_pos = final_pos
+        parser['StackNP'].push(node, content_end, (att, left_b, final_pos))
+        parser['LineNP'].open_block(node, self)
         return node
-
-    def close(self, node):
-        """Returns the position where the element was closed. """
-        parser = self.parser
-        caret = parser.caret
-        if node.content_end != caret:
-            return None
-        pos = parser.copy_pos()
-        if node.att is True:
-            parser.update(node.left_b)
-            parser['ElementNP'].get_attribute_list(parser, node)
-        parser.update(node.final_pos)
-        parser['ElementNP'].get_attribute_list(parser, node)
-        del node.att
-        del node.left_b
-        del node.content_end
-        del node.final_pos
-        return pos
@@ -4,11 +4,7 @@ Processes horizontal rules.
 
 """
 
-import re
 from lexor.core import NodeParser, Void
-RE = re.compile(
-    r'\n((-+[ ]{0,2}){3,}|(_+[ ]{0,2}){3,}|(\*+[ ]{0,2}){3,})[ ]*(\n|$)'
-)
 
 
 class HrNP(NodeParser):
@@ -16,9 +12,9 @@ class HrNP(NodeParser):
 
     def make_node(self):
         parser = self.parser
-        caret = parser.caret
-        match = RE.match(parser.text, caret-1)
-        if match is None:
+        lines = parser['LineNP']
+        num = lines.line_after(parser.caret-1)
+        if not lines.is_kind(num, lines.HR):
             return None
-        parser.update(match.end())
+        parser.update(lines.end(num))
         return Void('hr')
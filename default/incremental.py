@@ -0,0 +1,530 @@
+"""LEXOR: INCREMENTAL Parser
+
+Parser for documents that are parsed over and over with small
+changes, for instance by an editor with a live preview. The top level
+of the document is split into blocks at blank lines and the nodes
+obtained from each block are kept for the next call to `parse`. Only
+the blocks whose text changed are parsed again:
+
+    from lexor.command.lang import get_style_module
+    style = get_style_module('parser', 'lexor', 'default')
+    parser = style.MOD['incremental'].IncrementalParser()
+    parser.parse(text)
+    parser.parse(edited_text)
+
+The same blocks allow `ParallelParser` to parse a large document in
+a pool of processes.
+
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from multiprocessing import Pool
+from lexor.util import Position
+from lexor.core.elements import Document, Element, Text, Void
+from lexor.core.parser import Parser
+from lexor.command.lang import load_rel, map_explanations
+
+StyleParser = load_rel(__file__, 'base').StyleParser
+
+BOUNDARY_RE = re.compile(r'\n[ \t\r\f\v]*\n(?:[ \t\r\f\v]*\n)*')
+OPAQUE_RE = re.compile(
+    r'^(~{4,})[ ]*$|<!--|<!|%%!|(?:<|%%\{)([a-zA-Z]+)',
+    re.MULTILINE
+)
+# Closing delimiters of the node parsers, `StreamParser` places them
+# after the text it has read.
+LOOKAHEAD = (
+    'x]x)x}x>x-->x!>x?>x]]>x%%x"x\'x$x$$x\\)x\\]x_ x__ x___ x* x** x*** x' +
+    '`'*16 + 'x'
+)
+
+
+class IncrementalParser(StyleParser):
+    """A `Parser` that keeps the nodes and messages of every top
+    level block of the last document it parsed. A block is reused
+    when it has the same text as a block of the previous document,
+    its nodes are cloned and their positions shifted to the line
+    where the block is now located.
+
+    A block never starts inside a fenced code block, a comment or a
+    raw text element. After a block is parsed it is merged with the
+    blocks that follow it if the parser went past its end or if a
+    node was still in progress, this takes care of elements and
+    `%%{define}` regions that contain blank lines. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None):
+        Parser.__init__(self, lang, style, defaults)
+        self._cache = dict()
+        self._bounds = None
+
+    def split(self, text):
+        """Return the indices where the blocks of `text` start. """
+        raw = self.style_module.MOD['element'].RAWTEXT_ELEMENT
+        lower = text.lower()
+        bounds = [0]
+        opaque_end = 0
+        for match in BOUNDARY_RE.finditer(text):
+            index = match.end()
+            while opaque_end < index:
+                opaque = OPAQUE_RE.search(text, opaque_end, index)
+                if opaque is None:
+                    opaque_end = index
+                    break
+                opaque_end = self._opaque_end(text, lower, opaque, raw)
+            if opaque_end <= index < len(text):
+                bounds.append(index)
+        bounds.append(len(text))
+        return bounds
+
+    @staticmethod
+    def _opaque_end(text, lower, match, raw):
+        """Return the index where the region opened by `match` ends,
+        the end of the text if it is never closed. """
+        start = match.end()
+        token = match.group(0)
+        if match.group(1):
+            total = len(match.group(1))
+            closing = re.compile(r'\n~{%d,}[ ]*(\n|$)' % total)
+            found = closing.search(text, start)
+            return found.end() if found else len(text)
+        elif token == '<!--':
+            index = text.find('-->', start)
+            return index + 3 if index != -1 else len(text)
+        elif token == '<!':
+            index = text.find('!>', start)
+            if index == -1:
+                index = text.find('>', start)
+            return index + 2 if index != -1 else len(text)
+        elif token == '%%!':
+            index = text.find('%%', start)
+            return index + 2 if index != -1 else len(text)
+        elif match.group(2).lower() in raw:
+            name = match.group(2).lower()
+            index = lower.find('</%s' % name, start)
+            if token[0] == '%':
+                index = max(index, text.find('%%', start))
+            return index + 2 if index != -1 else len(text)
+        return start
+
+    def _next_bound(self, index):
+        """Return the first block start after `index`. """
+        return self._bounds[bisect_right(self._bounds, index)]
+
+    def _parse_until(self, stop):
+        """The main parsing loop of `Parser._parse` stopping at the
+        index `stop` instead of the end of the text. The node parsers
+        still see the whole text. """
+        self.current_node = crt = self.doc
+        self._in_progress = []
+        while self.caret < stop:
+            tmp = self._close_node()
+            if tmp is not None:
+                self.current_node = crt = tmp
+                continue
+            match = False
+            processor = None
+            for processor in self._get_np(crt):
+                node = processor.make_node()
+                if node is not None:
+                    match = True
+                    break
+                elif self.caret == self.end:
+                    break
+            if match is False:
+                self._process_text(crt)
+            elif self._process_node(crt, node, processor) is node:
+                self.current_node = crt = node
+
+    def _parse_block(self, start, stop, line):
+        """Parse the text from `start` to `stop` and return the block
+        entry along with the index where the block ends. """
+        end = len(self.text)
+        while True:
+            self.doc = Document(self._lang)
+            self.log = Document("lexor", "log")
+            self.log.modules = dict()
+            self.log.explanation = dict()
+            self.caret = start
+            self.pos = [line, 1]
+            self._parse_until(stop)
+            if stop == end:
+                break
+            if self.caret > stop:
+                stop = self._next_bound(self.caret - 1)
+            elif self._in_progress:
+                stop = end
+            else:
+                break
+        for node, _ in self._in_progress:
+            self.msg(self.__module__, 'E100', node.node_position, [node.name])
+        entry = (self.doc, list(self.log.child), self.log.modules, line)
+        return entry, stop
+
+    def _begin(self, text, uri):
+        """Prepare the parser to parse `text` as `Parser.parse` does
+        and split the text into blocks. """
+        if self._reload:
+            self.load_node_parsers()
+            self._cache = dict()
+        self.text = text
+        if uri:
+            self._uri = uri
+        else:
+            self._uri = 'string@0x%x' % id(text)
+        self.doc = Document(self._lang)
+        self.doc.uri_ = self._uri
+        self.log = Document("lexor", "log")
+        self.log.modules = dict()
+        self.log.explanation = dict()
+        self.end = len(text)
+        self.pos = [1, 1]
+        self.caret = 0
+        if hasattr(self.style_module, 'pre_process'):
+            self.style_module.pre_process(self)
+        self._bounds = self.split(text)
+        return self.doc, self.log
+
+    def _finish(self, doc, log, line):
+        """Restore the document and log after the blocks have been
+        spliced into them. """
+        text = self.text
+        self.doc = doc
+        self.log = log
+        self.caret = self.end = len(text)
+        self.pos = [line, len(text) - text.rfind('\n') if text else 1]
+        if hasattr(self.style_module, 'post_process'):
+            self.style_module.post_process(self)
+        map_explanations(self.log.modules, self.log.explanation)
+
+    def parse(self, text, uri=None):
+        """Parse the given `text` reusing the blocks of the previous
+        call that did not change. """
+        doc, log = self._begin(text, uri)
+        cache = dict()
+        line = 1
+        num = 0
+        while num + 1 < len(self._bounds):
+            start = self._bounds[num]
+            end = self._bounds[num+1]
+            key = (start == 0, text[start:end])
+            entry = cache.get(key) or self._cache.get(key)
+            if entry is None:
+                entry, end = self._parse_block(start, end, line)
+                key = (start == 0, text[start:end])
+                while self._bounds[num+1] < end:
+                    num += 1
+            cache[key] = entry
+            splice(doc, log, entry, line, self._uri)
+            line += text.count('\n', start, end)
+            num += 1
+        self._cache = cache
+        self._finish(doc, log, line)
+
+
+class ParallelParser(IncrementalParser):
+    """A `Parser` that parses the top level blocks of a document in
+    a pool of processes. The blocks are obtained as in
+    `IncrementalParser` and the result is the same as the one of
+    `Parser.parse`. Every block is parsed by a worker, the ones that
+    end up being part of a previous block are discarded. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None,
+                 processes=None):
+        IncrementalParser.__init__(self, lang, style, defaults)
+        self.processes = processes
+
+    def parse(self, text, uri=None):
+        """Parse the given `text` using a pool of processes. """
+        doc, log = self._begin(text, uri)
+        bounds = self._bounds
+        lines = [1]
+        for num in xrange(1, len(bounds)):
+            nlines = text.count('\n', bounds[num-1], bounds[num])
+            lines.append(lines[-1] + nlines)
+        tasks = zip(bounds[:-1], bounds[1:], lines)
+        record = self.style_module.MOD['record']
+        pool = Pool(self.processes, _init_worker, (self,))
+        try:
+            results = pool.map(_parse_task, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        num = 0
+        while num < len(results):
+            if results[num] is None:
+                entry, end = self._parse_block(*tasks[num])
+                splice(doc, log, entry, lines[num], self._uri)
+            else:
+                end, data = results[num]
+                entry = record.load_entry(data)
+                splice(doc, log, entry, lines[num], self._uri, False)
+            num = bisect_left(bounds, end)
+        self._finish(doc, log, lines[-1])
+
+
+class StreamParser(IncrementalParser):
+    """A `Parser` that reads the text from a file object in chunks
+    and yields the top level nodes of the document as soon as the
+    block that contains them has been parsed:
+
+        parser = StreamParser()
+        with open('big.lex') as stream:
+            for node in parser.iterparse(stream):
+                writer.write(node, sys.stdout)
+
+    Only the text of the blocks that have not been parsed is kept in
+    memory. A block is parsed once the text that follows it contains
+    the start of another block, the last one when the stream is
+    exhausted. The messages are appended to `log` in document order,
+    the ones about the macros once the stream is exhausted as
+    `Parser.parse` does.
+    Until the stream is exhausted the text that has been read is
+    followed by `LOOKAHEAD`, a node parser that looks for a closing
+    delimiter that has not been read finds it there instead of
+    failing. A block is kept, along with the character before it, and
+    parsed again after reading more text if it ends past the start of
+    the last block of the text, if one of its nodes closes in
+    `LOOKAHEAD` (see `ScheduleNP`) or if it contains an opening tag
+    that ends there. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None):
+        IncrementalParser.__init__(self, lang, style, defaults)
+        self._unread = None
+        self._lookahead = False
+
+    def iterparse(self, stream, uri=None, size=65536):
+        """Read `stream` in chunks of `size` characters and yield the
+        top level nodes of the document. """
+        if self._reload:
+            self.load_node_parsers()
+        if uri:
+            self._uri = uri
+        else:
+            self._uri = 'stream@0x%x' % id(stream)
+        log = Document("lexor", "log")
+        log.modules = dict()
+        log.explanation = dict()
+        self.log = log
+        if hasattr(self.style_module, 'pre_process'):
+            self.style_module.pre_process(self)
+        lines = self['LineNP']
+        macros = self['MacroNP']
+        macros.table = self.style_module.MOD['define'].MacroTable()
+        cycles = list()
+        text = ''
+        base = 1
+        begin = 0
+        pending = None
+        done = False
+        read = size
+        try:
+            while not done:
+                chunk = stream.read(read)
+                done = not chunk
+                text += chunk
+                last = self._begin_chunk(text, base, done)
+                start = begin
+                line = base + begin
+                while start < last:
+                    stop = self._next_bound(start)
+                    self._lookahead = False
+                    entry, end = self._parse_block(start, stop, line)
+                    if end > last or self._lookahead:
+                        break
+                    copy_messages(log, entry[1], entry[2], 0, self._uri)
+                    macros.table.define_nodes(
+                        entry[0], lambda *args: cycles.append(args)
+                    )
+                    for node in list(entry[0].child):
+                        if isinstance(node, Text) and pending is not None:
+                            pending.data += node.data
+                            continue
+                        if pending is not None:
+                            yield pending
+                            pending = None
+                        if isinstance(node, Text):
+                            pending = node
+                        else:
+                            yield node
+                    line += text.count('\n', start, end)
+                    start = end
+                if start == begin:
+                    read *= 2
+                    continue
+                read = size
+                base = line - 1
+                text = text[start-1:]
+                begin = 1
+            if pending is not None:
+                yield pending
+        finally:
+            self.log = log
+            lines.first_line = 1
+        for node, cycle in cycles:
+            macros.report(node, cycle)
+        map_explanations(log.modules, log.explanation)
+
+    def _begin_chunk(self, text, base, done):
+        """Prepare the parser to parse the blocks in the part of the
+        document held in `text`, which starts at the line `base`, and
+        return the index where the blocks that may depend on text that
+        has not been read start. The text is followed by `LOOKAHEAD`
+        unless the stream is `done`, in which case `text` is the rest
+        of the document. """
+        self._bounds = bounds = self.split(text)
+        self['LineNP'].first_line = base
+        if done:
+            self.text = text
+            self.end = len(text)
+            self._unread = None
+            return len(text)
+        self._unread = len(text)
+        self.text = text + LOOKAHEAD
+        self.end = bounds[-1] = len(self.text)
+        index = self['ElementNP'].open_tag(len(text))
+        if index is not None and index < bounds[-2]:
+            return index
+        return bounds[-2]
+
+    def _process_node(self, crt, node, processor):
+        """Same as `Parser._process_node`, it also notes if a node in
+        progress closes in `LOOKAHEAD`. """
+        if Parser._process_node(self, crt, node, processor) is not node:
+            return None
+        if self._unread is None:
+            return node
+        if hasattr(processor, 'owner'):
+            processor = processor.owner(node)
+        close_at = getattr(processor, 'close_at', None)
+        if close_at is not None and close_at(node) >= self._unread:
+            self._lookahead = True
+        return node
+
+
+def _init_worker(parser):
+    """Keep the parser given to the process pool. The parser was
+    prepared by `parse` before the process was started. """
+    _init_worker.parser = parser
+_init_worker.parser = None
+
+
+def _parse_task(task):
+    """Parse a block in a worker process. A block that starts inside
+    of another block may make a node parser fail, in which case None
+    is returned. If the block is needed it is parsed again by the
+    main process. """
+    parser = _init_worker.parser
+    try:
+        entry, end = parser._parse_block(*task)
+    except Exception:  # pylint: disable=W0703
+        return None
+    return end, parser.style_module.MOD['record'].dump_entry(entry)
+
+
+def splice(doc, log, entry, line, uri, copy=True):
+    """Append copies of the nodes and messages of a block entry to
+    `doc` and `log`. The block starts at `line`. If `copy` is False
+    the nodes of the entry are appended instead of their copies, the
+    entry may not be used again. """
+    block, messages, modules, old_line = entry
+    delta = line - old_line
+    id_dict = doc.id_dict
+    doc.id_dict = dict()
+    ids = list(block.id_dict.items())
+    copies = dict((id(node), None if copy else node) for _, node in ids)
+    for node in block.child:
+        clone = copy_node(node, delta, copies) if copy else node
+        if isinstance(clone, Text) and doc.child and \
+                isinstance(doc.child[-1], Text):
+            doc.child[-1].data += clone.data
+        else:
+            doc.append_child(clone)
+    doc.id_dict = id_dict
+    for key, node in ids:
+        if copies[id(node)] is not None:
+            id_dict[key] = copies[id(node)]
+    copy_messages(log, messages, modules, delta, uri)
+
+
+def copy_messages(log, messages, modules, delta, uri):
+    """Append copies of the messages of a block to `log` with their
+    positions moved `delta` lines. The messages issued at line 0, such
+    as the ones about nodes the main loop closed, have no position in
+    the document and are not moved. """
+    for name in modules:
+        if name not in log.modules:
+            log.modules[name] = modules[name]
+    for msg in messages:
+        node = Void('msg')
+        node['module'] = msg['module']
+        node['code'] = msg['code']
+        line, column = msg['position']
+        if line > 0:
+            line += delta
+        node['position'] = [line, column]
+        node['uri'] = uri
+        node['arg'] = shift_arg(msg['arg'], delta)
+        log.append_child(node)
+
+
+def copy_node(node, delta, copies=None):
+    """Return a deep copy of `node` with its positions moved `delta`
+    lines. Unlike `clone_node`, the values that the node parsers keep
+    in the elements without making them attributes, such as `pos`,
+    are also copied. The copy of a node whose `id` is a key of the
+    optional dictionary `copies` is stored in it. """
+    if copies is None:
+        copies = dict()
+    root = _copy_single(node, delta)
+    stack = [(node, root)]
+    while stack:
+        orig, clone = stack.pop()
+        if id(orig) in copies:
+            copies[id(orig)] = clone
+        for child in orig.child or ():
+            tmp = _copy_single(child, delta)
+            clone.append_child(tmp)
+            stack.append((child, tmp))
+    return root
+
+
+def _copy_single(node, delta):
+    """Helper function for copy_node. """
+    clone = node.clone_node()
+    if node.line:
+        clone.set_position(node.line+delta, node.column)
+    if not isinstance(node, Element):
+        return clone
+    for key, val in node.__dict__.items():
+        if key not in clone.__dict__:
+            clone.__dict__[key] = val
+    if delta:
+        for key in ('pos', '_pos'):
+            val = clone.__dict__.get(key)
+            if isinstance(val, list):
+                clone.__dict__[key] = [val[0]+delta, val[1]]
+        if '_alref' in clone:
+            clone['_alref'] = [
+                ([pos[0]+delta, pos[1]], val)
+                for pos, val in clone['_alref']
+            ]
+    return clone
+
+
+def shift_arg(arg, delta):
+    """Return a copy of the arguments of a message with its positions
+    moved `delta` lines. The positions are either `Position` objects
+    or the argument itself when it starts with a line and column. """
+    if isinstance(arg, list) and len(arg) > 1 and \
+            isinstance(arg[0], int) and isinstance(arg[1], int):
+        return [arg[0]+delta] + arg[1:]
+    tmp = list()
+    for item in arg:
+        if isinstance(item, Position):
+            item = Position([item.line+delta, item.column], item.fmt)
+        tmp.append(item)
+    if isinstance(arg, tuple):
+        return tuple(tmp)
+    return tmp
@@ -4,6 +4,9 @@ Here we define several parsers for inline patterns.
 
 """
 
+import re
+from array import array
+from bisect import bisect_left
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Element
 
@@ -33,14 +36,49 @@ class InlinePatternNP(NodeParser):
         self.pattern = None
         self.tight = True
         self.tagname = None
+        self._text = None
+        self._run_start = None
+        self._run_end = None
+
+    def index_runs(self):
+        """Record the start and end of every run of the first
+        character of the pattern which is long enough to contain the
+        pattern. The index is built once per document. """
+        text = self.parser.text
+        if self._text is text:
+            return
+        run_re = re.compile('%s{%d,}' % (
+            re.escape(self.pattern[0]), len(self.pattern)
+        ))
+        self._text = text
+        self._run_start = array('l')
+        self._run_end = array('l')
+        for match in run_re.finditer(text):
+            self._run_start.append(match.start())
+            self._run_end.append(match.end())
+
+    def find_pattern(self, start, end):
+        """Same as `parser.text.find(self.pattern, start, end)` but
+        it uses the index of runs instead of scanning the text. """
+        self.index_runs()
+        size = len(self.pattern)
+        num = bisect_left(self._run_end, start+size)
+        if num == len(self._run_end):
+            return -1
+        index = max(start, self._run_start[num])
+        if index+size > end:
+            return -1
+        return index
 
     def make_node(self):
         parser = self.parser
         caret = parser.caret
         content_start = caret+len(self.pattern)
-        if parser.text[caret:content_start] != self.pattern:
+        if not parser.text.startswith(self.pattern, caret):
             return None
-        content_end = parser.text.find(self.pattern, content_start)
+        content_end = self.find_pattern(
+            content_start, parser['LineNP'].window()
+        )
         if content_end == -1 or content_start == content_end:
             return None
         if self.tight is True:
@@ -50,24 +88,30 @@ class InlinePatternNP(NodeParser):
                 return None
         node = Element(self.tagname)
         node.pos = parser.copy_pos()
-        node.inlinepattern_end = content_end
+        parser['StackNP'].push(node, content_end)
         parser.update(content_start)
         return node
 
+    def close_at(self, node):
+        """The node closes where its closing delimiter starts. """
+        return self.parser['StackNP'].end(node)
+
     def close(self, node):
         parser = self.parser
         caret = parser.caret
-        if caret != node.inlinepattern_end:
+        stack = parser['StackNP']
+        if caret != stack.end(node):
             return None
+        stack.pop(node)
         pos = parser.copy_pos()
         parser.update(caret+len(self.pattern))
         parser['ElementNP'].get_attribute_list(parser, node)
-        del node.inlinepattern_end
         return pos
 
 
 class StrongNP(InlinePatternNP):
     """Parse text located between `**` and `**`. """
+    trigger = '*'
 
     def __init__(self, parser):
         InlinePatternNP.__init__(self, parser)
@@ -77,6 +121,7 @@ class StrongNP(InlinePatternNP):
 
 class Strong2NP(InlinePatternNP):
     """Parse text located between `__` and `__`. """
+    trigger = '_'
 
     def __init__(self, parser):
         InlinePatternNP.__init__(self, parser)
@@ -86,6 +131,7 @@ class Strong2NP(InlinePatternNP):
 
 class EmNP(InlinePatternNP):
     """Parser text located between '*' and '*'. """
+    trigger = '*'
 
     def __init__(self, parser):
         InlinePatternNP.__init__(self, parser)
@@ -96,6 +142,7 @@ class EmNP(InlinePatternNP):
 
 class StrongEmNP(InlinePatternNP):
     """Checks for triple `*`. """
+    trigger = '*'
 
     def __init__(self, parser):
         InlinePatternNP.__init__(self, parser)
@@ -106,6 +153,7 @@ class StrongEmNP(InlinePatternNP):
 
 class EmStrongNP(InlinePatternNP):
     """Checks for triple `_`. """
+    trigger = '_'
 
     def __init__(self, parser):
         InlinePatternNP.__init__(self, parser)
@@ -116,17 +164,19 @@ class EmStrongNP(InlinePatternNP):
 
 class SmartEmNP(NodeParser):
     """Checks for _em_. """
+    trigger = '_'
 
     def make_node(self):
         parser = self.parser
         if parser.text[parser.caret] != '_':
             return None
-        if parser.text[parser.caret-1] not in EMPTY:
+        if parser.text[parser.caret-1:parser.caret] not in EMPTY:
             return None
         found = False
         index = parser.caret
+        end = parser['LineNP'].window()
         while found is False:
-            index = parser.text.find('_', index+1, parser.end)
+            index = parser.text.find('_', index+1, end)
             if index == -1 or parser.text[index-1] in EMPTY:
                 return None
             char = parser.text[index+1:index+2]
@@ -140,18 +190,23 @@ class SmartEmNP(NodeParser):
         parser.update(parser.caret+1)
         node = Element('em')
         node.pos = pos
-        node.smartem_end = index
+        parser['StackNP'].push(node, index)
         return node
 
+    def close_at(self, node):
+        """The node closes where its closing delimiter starts. """
+        return self.parser['StackNP'].end(node)
+
     def close(self, node):
         parser = self.parser
         caret = parser.caret
-        if caret != node.smartem_end:
+        stack = parser['StackNP']
+        if caret != stack.end(node):
             return None
+        stack.pop(node)
         pos = parser.copy_pos()
         parser.update(caret+1)
         parser['ElementNP'].get_attribute_list(parser, node)
-        del node.smartem_end
         return pos
 
 
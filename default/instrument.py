@@ -0,0 +1,123 @@
+"""LEXOR: INSTRUMENT NodeParser
+
+Measures the time spent in each node parser. The instrumentation is
+only installed when the parser is created with the option `profile`
+set to `on`:
+
+    parser = Parser('lexor', 'default', {'profile': 'on'})
+    parser.parse(text)
+    print(parser['InstrumentNP'].table())
+
+Otherwise the node parsers are left untouched and there is no
+overhead.
+
+"""
+
+from timeit import default_timer
+from lexor.core.parser import NodeParser
+
+FIELDS = ('calls', 'hits', 'misses', 'closes', 'time', 'max', 'consumed')
+
+
+class InstrumentNP(NodeParser):
+    """Wraps the `make_node` and `close` methods of the node parsers
+    to record, for each one of them, the number of calls to
+    `make_node`, how many returned a node (hits) and how many did not
+    (misses), the number of calls to `close`, the cumulative and
+    maximum time of these calls in seconds and the number of
+    characters that the caret moved over during the calls. The times
+    include the time spent in the node parsers called by a node
+    parser. The records are cleared by `reset`, which the style calls
+    before every parse. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.stats = dict()
+
+    def install(self):
+        """Wrap the methods of every node parser in the repository
+        except for this one and `DispatchNP`, which only forwards the
+        calls to the others. """
+        for val in self.parser.style_module.REPOSITORY:
+            name = val.__name__
+            if name in ('InstrumentNP', 'DispatchNP'):
+                continue
+            nodeparser = self.parser[name]
+            record = dict.fromkeys(FIELDS, 0)
+            self.stats[name] = record
+            nodeparser.make_node = self._wrap_make_node(
+                nodeparser.make_node, record
+            )
+            nodeparser.close = self._wrap_close(nodeparser.close, record)
+
+    def reset(self):
+        """Clear the records. """
+        for record in self.stats.values():
+            for key in FIELDS:
+                record[key] = 0
+
+    def _wrap_make_node(self, make_node, record):
+        """Return a version of `make_node` that updates `record`. """
+        parser = self.parser
+
+        def timed_make_node():
+            """Instrumented `make_node`. """
+            caret = parser.caret
+            start = default_timer()
+            node = make_node()
+            elapsed = default_timer() - start
+            record['calls'] += 1
+            if node is None:
+                record['misses'] += 1
+            else:
+                record['hits'] += 1
+            record['time'] += elapsed
+            if elapsed > record['max']:
+                record['max'] = elapsed
+            record['consumed'] += max(parser.caret - caret, 0)
+            return node
+        return timed_make_node
+
+    def _wrap_close(self, close, record):
+        """Return a version of `close` that updates `record`. """
+        parser = self.parser
+
+        def timed_close(node):
+            """Instrumented `close`. """
+            caret = parser.caret
+            start = default_timer()
+            pos = close(node)
+            elapsed = default_timer() - start
+            record['closes'] += 1
+            record['time'] += elapsed
+            if elapsed > record['max']:
+                record['max'] = elapsed
+            record['consumed'] += max(parser.caret - caret, 0)
+            return pos
+        return timed_close
+
+    def report(self):
+        """Return a list of `(name, record)` pairs sorted by the
+        cumulative time, the slowest node parser first. The records
+        are dictionaries with the keys in `FIELDS`. """
+        return sorted(
+            ((name, dict(record)) for name, record in self.stats.items()),
+            key=lambda item: (-item[1]['time'], item[0])
+        )
+
+    def table(self):
+        """Return the report as a text table. """
+        lines = ['%-24s %8s %8s %8s %8s %10s %10s %10s' % (
+            'node parser', 'calls', 'hits', 'misses', 'closes',
+            'time (ms)', 'max (ms)', 'consumed'
+        )]
+        for name, record in self.report():
+            lines.append('%-24s %8d %8d %8d %8d %10.3f %10.3f %10d' % (
+                name, record['calls'], record['hits'], record['misses'],
+                record['closes'], record['time'] * 1000,
+                record['max'] * 1000, record['consumed']
+            ))
+        return '\n'.join(lines)
+
+    def make_node(self):
+        return None
@@ -4,10 +4,14 @@ Processes LaTeX elements.
 
 """
 
+import re
+from array import array
+from bisect import bisect_right
 from lexor.core.parser import NodeParser
 from lexor.core.elements import RawText, Entity
 
 EMPTY = ' \t\n\r\f\v'
+DOLLAR_RE = re.compile(r'(?<!\\)\$')
 MAP = {
     '$': '$',
     '\\(': '\\)',
@@ -18,61 +22,90 @@ MAP = {
 
 class LatexDisplayNP(NodeParser):
     """Parse text enclosed by $$, \\[. """
+    trigger = '$\\'
 
     def make_node(self):
         parser = self.parser
         if parser.text[parser.caret] not in ['$', '\\']:
             return None
         caret = parser.caret
-        start = parser.text[caret:caret+2]
-        if start in ['$$', '\\[']:
-            index = parser.text.find(MAP[start], caret+2, parser.end)
-            if index == -1:
-                self.msg('E100', parser.pos)
-                parser.update(caret+1)
-                return Entity(start[0])
-            node = RawText('latex', parser.text[caret+2:index])
-            node['type'] = 'display'
-            node['char'] = start[0]
-            parser.update(index+2)
-            return node
-        return None
+        if parser.text.startswith('$$', caret):
+            start = '$$'
+        elif parser.text.startswith('\\[', caret):
+            start = '\\['
+        else:
+            return None
+        index = parser['OpaqueNP'].find(
+            MAP[start], caret+2, parser['LineNP'].window()
+        )
+        if index == -1:
+            self.msg('E100', parser.pos)
+            parser.update(caret+1)
+            return Entity(start[0])
+        spans = parser['SpanNP']
+        node = spans.new(RawText, 'latex', spans.span(caret+2, index))
+        node['type'] = 'display'
+        node['char'] = start[0]
+        parser.update(index+2)
+        return node
 
 
 class LatexInlineNP(NodeParser):
-    """Parse text enclosed by $, \\(. """
+    """Parse text enclosed by $, \\(. The offsets of the dollar
+    signs that are not escaped are found once per document, the
+    closing dollar of an opening one is the next offset in the
+    list. """
+    trigger = '$\\'
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._dollars = None
+
+    def next_dollar(self, index):
+        """Return the offset of the first dollar sign after `index`
+        that is not preceded by a backslash or -1. """
+        if self._text is not self.parser.text:
+            self._text = self.parser.text
+            self._dollars = array('l', (
+                match.start() for match in DOLLAR_RE.finditer(self._text)
+            ))
+        num = bisect_right(self._dollars, index)
+        if num == len(self._dollars):
+            return -1
+        return self._dollars[num]
 
     def make_node(self):
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+2] == '\\(':
-            start = parser.text[caret:caret+2]
-        elif parser.text[caret:caret+1] == '$':
-            start = parser.text[caret:caret+1]
-        else:
-            return None
-        if start == '$' and parser.text[caret+1:caret+2] in EMPTY:
-            parser.update(caret+1)
-            return Entity('$')
-        index = parser.text.find(MAP[start], caret+1, parser.end)
-        if start == '\\(' and index != -1:
-            node = RawText('latex', parser.text[caret+2:index])
+        if parser.text.startswith('\\(', caret):
+            end = parser['LineNP'].window()
+            index = parser['OpaqueNP'].find('\\)', caret+1, end)
+            if index == -1:
+                parser.update(caret+1)
+                return Entity('$')
+            spans = parser['SpanNP']
+            node = spans.new(RawText, 'latex', spans.span(caret+2, index))
             node['type'] = 'inline'
-            node['char'] = start[0]
+            node['char'] = '\\'
             parser.update(index+2)
             return node
-        while index != -1:
-            char = parser.text[index-1]
-            if char == '\\':
-                index = parser.text.find('$', index+1, parser.end)
-            elif char not in EMPTY:
-                node = RawText('latex', parser.text[caret+1:index])
+        elif parser.text[caret:caret+1] != '$':
+            return None
+        if parser.text[caret+1:caret+2] in EMPTY:
+            parser.update(caret+1)
+            return Entity('$')
+        index = self.next_dollar(caret)
+        if index != -1 and index < parser['LineNP'].window():
+            if parser.text[index-1] not in EMPTY:
+                spans = parser['SpanNP']
+                node = spans.new(
+                    RawText, 'latex', spans.span(caret+1, index)
+                )
                 node['type'] = 'inline'
-                node['char'] = start[0]
+                node['char'] = '$'
                 parser.update(index+1)
                 return node
-            else:
-                break
         parser.update(caret+1)
         return Entity('$')
 
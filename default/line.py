@@ -0,0 +1,206 @@
+"""LEXOR: LINE NodeParser
+
+Classifies every line of the document in one pass. The block node
+parsers look up the type of a line instead of matching it with their
+own regular expressions every time the parser reaches a new line. The
+offsets where the lines start are also used to compute the positions
+reported in the messages.
+
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import izip, islice
+from lexor.core.parser import NodeParser
+
+BLANK_RE = re.compile(r'[ \t\r\f\v]*$')
+SETEXT_RE = re.compile(r'[=-]+[ ]*$')
+HR_RE = re.compile(
+    r'((-+[ ]{0,2}){3,}|(_+[ ]{0,2}){3,}|(\*+[ ]{0,2}){3,})[ ]*$'
+)
+FENCE_RE = re.compile(r'~{3,}[~]+[ ]*$')
+
+
+class LineNP(NodeParser):
+    """Keeps the type of every line of the document. This node parser
+    does not create nodes, it is used by the block node parsers. The
+    type of a line is a combination of the following flags:
+
+        BLANK: only whitespace
+        SETEXT: setext header underline, i.e. `====` or `----`
+        HR: horizontal rule
+        FENCE: row of four or more `~`
+
+    A line without any of these flags is paragraph text. Note that a
+    line may have more than one flag, `---` is both a setext
+    underline and a horizontal rule. """
+    BLANK = 1
+    SETEXT = 2
+    HR = 4
+    FENCE = 8
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._start = None
+        self._kind = None
+        self._fence = None
+        self._tildes = None
+        self._blank = None
+        self._blocks = list()
+        self.first_line = 1
+
+    def index_lines(self):
+        """Record the offset where each line starts along with its
+        type. This is done once per document. """
+        text = self.parser.text
+        self._text = text
+        self._start = array('l', [0])
+        self._start.extend(match.end() for match in re.finditer('\n', text))
+        self._kind = array('B', (
+            self._classify(text, start, end-1)
+            for start, end in izip(self._start, islice(self._start, 1, None))
+        ))
+        self._kind.append(self._classify(text, self._start[-1], len(text)))
+        self._fence = None
+        self._blank = None
+
+    def _classify(self, text, start, end):
+        """Return the type of the line `text[start:end]`. """
+        char = text[start:start+1]
+        kind = 0
+        if not char or char in ' \t\n\r\f\v':
+            if BLANK_RE.match(text, start, end):
+                kind |= self.BLANK
+        elif char in '-=_*':
+            if SETEXT_RE.match(text, start, end):
+                kind |= self.SETEXT
+            if HR_RE.match(text, start, end):
+                kind |= self.HR
+        elif char == '~':
+            if FENCE_RE.match(text, start, end):
+                kind |= self.FENCE
+        return kind
+
+    def line_at(self, index):
+        """Return the number of the line starting at `index` or None
+        if `index` is not the beginning of a line. """
+        if self._text is not self.parser.text:
+            self.index_lines()
+        num = bisect_left(self._start, index)
+        if num < len(self._start) and self._start[num] == index:
+            return num
+        return None
+
+    def line_after(self, index):
+        """Return the number of the line following the newline at
+        `index` or None if there is no newline at `index`. A negative
+        index is taken to be 0. """
+        index = max(index, 0)
+        if self.parser.text[index:index+1] != '\n':
+            return None
+        return self.line_at(index+1)
+
+    def position(self, index):
+        """Return the position `[line, column]` of `index` in the text.
+        Unlike `parser.compute`, the index may be anywhere in the text
+        and it does not count the newlines between the caret and the
+        index. The first line of the text is `first_line`, a parser
+        that only holds part of a document may change it. """
+        if self._text is not self.parser.text:
+            self.index_lines()
+        num = bisect_right(self._start, index) - 1
+        return [num+self.first_line, index-self._start[num]+1]
+
+    def next_fence(self, index, total):
+        """Return the number of the first `FENCE` line with at least
+        `total` tildes which is preceded by a newline at or after
+        `index`, or None if there is no such line. The fences are
+        indexed the first time this method is called on a text. """
+        if self._text is not self.parser.text:
+            self.index_lines()
+        if self._fence is None:
+            text = self._text
+            self._fence = [
+                num for num, kind in enumerate(self._kind)
+                if kind & self.FENCE
+            ]
+            self._tildes = [
+                len(text[self._start[num]:self.end(num)].rstrip(' \n'))
+                for num in self._fence
+            ]
+        num = bisect_left(self._start, index+1)
+        pos = bisect_left(self._fence, num)
+        while pos < len(self._fence):
+            if self._tildes[pos] >= total:
+                return self._fence[pos]
+            pos += 1
+        return None
+
+    def paragraph_end(self, index):
+        """Return the index of the newline that precedes the first
+        `BLANK` line after the line containing `index`, or the length
+        of the text if there is no such line. This is where a
+        paragraph that contains `index` ends. """
+        if self._text is not self.parser.text:
+            self.index_lines()
+        if self._blank is None:
+            self._blank = array('l', (
+                num for num, kind in enumerate(self._kind)
+                if kind & self.BLANK
+            ))
+        num = bisect_right(self._start, index)
+        pos = bisect_left(self._blank, num)
+        if pos == len(self._blank):
+            return len(self._text)
+        return self._start[self._blank[pos]] - 1
+
+    def open_block(self, node, processor):
+        """Declare that the inline content of `node` ends at
+        `processor.block_end(node)`. The node parsers that define
+        `block_end` call it with the node returned by `make_node`. """
+        self._blocks.append((node, processor))
+
+    def window(self):
+        """Return the index where the inline node parsers stop looking
+        for closing delimiters. Inline nodes cannot extend past the
+        block that contains them, this is the end of the innermost
+        open block that contains the current node, or `parser.end` if
+        there is none. The blocks that were closed are dropped, and so
+        are the ones whose end is behind the caret: a node that stays
+        open past the end of its content, for instance a header whose
+        line ends inside of a comment, no longer bounds the search. """
+        parser = self.parser
+        blocks = self._blocks
+        while blocks:
+            node, processor = blocks[-1]
+            crt = parser.current_node
+            while crt is not None and crt is not node:
+                crt = crt.parent
+            if crt is not None:
+                end = processor.block_end(node)
+                if end > parser.caret:
+                    return min(end, parser.end)
+            blocks.pop()
+        return parser.end
+
+    def is_kind(self, num, kind):
+        """Check if the line `num` has the type `kind`. """
+        if num is None or num >= len(self._kind):
+            return False
+        return self._kind[num] & kind != 0
+
+    def start(self, num):
+        """Index where the line `num` starts. """
+        return self._start[num]
+
+    def end(self, num):
+        """Index right after the newline terminating the line `num`
+        or the end of the text if the line is the last one. """
+        if num+1 < len(self._start):
+            return self._start[num+1]
+        return len(self._text)
+
+    def make_node(self):
+        return None
@@ -27,6 +27,7 @@ from lexor.core.elements import Element
 
 class ListNP(NodeParser):
     """Look for list elements. """
+    closes_on = '\n'
 
     def make_node(self):
         parser = self.parser
@@ -75,12 +76,12 @@ class ListNP(NodeParser):
     def close(self, node):
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+3] == '\n%%':
+        if parser.text.startswith('\n%%', caret):
             pos = parser.copy_pos()
             parser.update(caret+1)
         elif parser.text[caret] == '\n' and parser.text[caret+1] in '*+^':
             pos = parser.copy_pos()
-        elif parser.text[caret:caret+8] == "\n</list>":
+        elif parser.text.startswith("\n</list>", caret):
             pos = parser.copy_pos()
             parser.update(caret+1)
         else:
@@ -0,0 +1,111 @@
+"""LEXOR: MAPPED Parser
+
+Parser for documents that are too large to be read into a string. The
+file is mapped into memory and the node parsers work on the mapped
+bytes, only the parts of the document that end up in the tree are
+copied:
+
+    from lexor.command.lang import get_style_module
+    style = get_style_module('parser', 'lexor', 'default')
+    parser = style.MOD['mapped'].MappedParser(encoding='utf-8')
+    parser.parse_file('big.lex')
+
+The operating system reads the pages of the file when they are
+needed and may drop them again, the memory held while parsing is the
+tree and the indices of the node parsers instead of a copy of the
+file.
+
+"""
+
+import os
+import mmap
+from lexor.core.parser import Parser
+from lexor.command.lang import load_rel
+from lexor.core.elements import CharacterData, Element
+
+StyleParser = load_rel(__file__, 'base').StyleParser
+
+# Largest span copied at once by `MappedText.count`.
+CHUNK = 1024*1024
+
+
+class MappedText(mmap.mmap):
+    """A read only memory map of a file that can be given to a parser
+    in place of a string. Indexing and slicing return strings, the
+    regular expressions search the map directly and the methods of
+    `str` used by the node parsers are provided:
+
+        text = MappedText(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        parser.parse(text, 'big.lex')
+
+    The map holds the bytes of the file, ASCII and UTF-8 documents
+    are parsed as if they had been read with `open(name).read()`. """
+
+    def startswith(self, prefix, start=0, end=None):
+        """Same as `str.startswith`. """
+        if isinstance(prefix, tuple):
+            return any(self.startswith(item, start, end) for item in prefix)
+        if end is None and start >= 0:
+            return self[start:start+len(prefix)] == prefix
+        start, end, _ = slice(start, end).indices(len(self))
+        if start + len(prefix) > end:
+            return False
+        return self[start:start+len(prefix)] == prefix
+
+    def count(self, sub, start=0, end=None):
+        """Same as `str.count`. A long span is copied in pieces of at
+        most `CHUNK` characters. """
+        start, end, _ = slice(start, end).indices(len(self))
+        if len(sub) != 1 or end - start <= CHUNK:
+            return self[start:end].count(sub)
+        total = 0
+        while start < end:
+            stop = min(start + CHUNK, end)
+            total += self[start:stop].count(sub)
+            start = stop
+        return total
+
+
+class MappedParser(StyleParser):
+    """A `Parser` that reads its documents through `MappedText`. If
+    an `encoding` is given then the text of the nodes and the values
+    of the attributes are decoded once the document is parsed, the
+    rest of the document is never decoded. The positions of the nodes
+    and messages count bytes, not characters. The map is released
+    when the parser moves on to another document. """
+
+    def __init__(self, lang='lexor', style='default', defaults=None,
+                 encoding=None):
+        Parser.__init__(self, lang, style, defaults)
+        self.encoding = encoding
+
+    def parse_file(self, name, uri=None):
+        """Map the file `name` and parse it. If no `uri` is given then
+        the name of the file is used. """
+        with open(name, 'rb') as stream:
+            if os.fstat(stream.fileno()).st_size == 0:
+                text = ''
+            else:
+                text = MappedText(
+                    stream.fileno(), 0, access=mmap.ACCESS_READ
+                )
+        self.parse(text, uri or name)
+        if self.encoding is not None:
+            decode(self.doc, self.encoding)
+
+
+def decode(doc, encoding):
+    """Decode the data of the character data nodes and the values of
+    the attributes of the elements in `doc`. """
+    stack = list(doc.child)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CharacterData) and isinstance(node.data, str):
+            node.data = node.data.decode(encoding)
+        if isinstance(node, Element):
+            for key in node._order:  # pylint: disable=W0212
+                val = node.__dict__[key]
+                if isinstance(val, str):
+                    node.__dict__[key] = val.decode(encoding)
+            if node.child:
+                stack.extend(node.child)
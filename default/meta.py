@@ -8,6 +8,11 @@ from lexor.core.parser import NodeParser
 from lexor.core.elements import Element, RawText
 
 
+def strip(content):
+    """Remove the whitespace around the value of an entry. """
+    return content.strip()
+
+
 class MetaNP(NodeParser):
     """Obtain the meta information. """
 
@@ -20,7 +25,10 @@ class MetaNP(NodeParser):
         line = parser.text[parser.caret:index].split(':', 1)
         if len(line) != 2 or line[0][-1:] == '\\':
             return None
-        node = RawText('entry', line[1].strip(), {'name': line[0]})
+        spans = parser['SpanNP']
+        start = parser.caret + len(line[0]) + 1
+        content = spans.span(start, index, strip)
+        node = spans.new(RawText, 'entry', content, {'name': line[0]})
         parser.update(index+1)
         return node
 
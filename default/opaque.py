@@ -0,0 +1,79 @@
+"""LEXOR: OPAQUE NodeParser
+
+Comments, character data, processing instructions, document types,
+raw text elements, display math and inline code are opaque: nothing
+is parsed inside of them and they end at a fixed terminator. The node
+parsers of these regions look up their terminators in an index of the
+document instead of searching the text every time they meet an
+opening delimiter, an unterminated one no longer costs a scan of the
+rest of the document.
+
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+from lexor.core.parser import NodeParser
+
+
+class OpaqueNP(NodeParser):
+    """Keeps the offsets of every occurrence of the terminators that
+    have been looked up in the document. This node parser does not
+    create nodes. The occurrences of a terminator are found in one
+    pass the first time it is needed and they may overlap, so that
+
+        parser['OpaqueNP'].find(sub, start, end)
+
+    returns the same as `parser.text.find(sub, start, end)`. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._offsets = dict()
+
+    def _reset(self):
+        """Forget the previous text if the parser is working on a new
+        one. """
+        if self._text is not self.parser.text:
+            self._text = self.parser.text
+            self._offsets.clear()
+
+    def offsets(self, sub, fold=False):
+        """Return the sorted array of offsets where `sub` occurs in the
+        text. If `fold` is True the case of the text is ignored. """
+        self._reset()
+        key = (sub, fold)
+        if key not in self._offsets:
+            flags = re.I | re.U if fold else 0
+            pattern = re.compile('(?=%s)' % re.escape(sub), flags)
+            self._offsets[key] = array('l', (
+                match.start() for match in pattern.finditer(self._text)
+            ))
+        return self._offsets[key]
+
+    def find(self, sub, start, end=None, fold=False):
+        """Return the lowest index in `parser.text[start:end]` where
+        `sub` is found or -1 if it does not occur. If `fold` is True
+        then `sub` must be in lower case and it is compared against
+        the text in lower case. """
+        offsets = self.offsets(sub, fold)
+        num = bisect_left(offsets, start)
+        if num == len(offsets):
+            return -1
+        index = offsets[num]
+        if end is not None and index + len(sub) > end:
+            return -1
+        return index
+
+    def startswith(self, sub, index):
+        """Return True if the text at `index` starts with `sub`,
+        which must be in lower case, ignoring the case of the text.
+        This is the same as
+
+            parser.text[index:index+len(sub)].lower() == sub
+
+        but neither the text nor a part of it is copied. """
+        return self.find(sub, index, index+len(sub), True) == index
+
+    def make_node(self):
+        return None
@@ -29,6 +29,7 @@ INVALID_TAGS = [
 
 class ParagraphNP(NodeParser):
     """Checks for valid paragraphs. """
+    closes_on = '\n<%'
 
     def make_node(self):
         """Returns a paragraph element. """
@@ -40,18 +41,21 @@ class ParagraphNP(NodeParser):
         except IndexError:
             parser.update(index)
             return None
-        end = parser.end
-        tmp = parser['AutoLinkNP'].is_auto_link(parser, index, end)
-        if tmp is None:
-            tmp = parser['AutoMailNP'].is_auto_mail(parser, index, end)
-            if tmp is None:
-                tmp = parser['ElementNP'].get_tagname(parser)
-                if tmp is not None and tmp not in VALID_TAGS:
-                    return None
+        angle = parser['AngleNP']
+        kind, tmp = angle.classify(index)
+        if kind not in (angle.AUTOLINK, angle.AUTOMAIL) or tmp >= parser.end:
+            tmp = parser['ElementNP'].get_tagname(parser)
+            if tmp is not None and tmp not in VALID_TAGS:
+                return None
         node = Element('p')
         node.pos = parser.copy_pos()
+        parser['LineNP'].open_block(node, self)
         return node
 
+    def block_end(self, node):
+        """The paragraph ends right before the next blank line. """
+        return self.parser['LineNP'].paragraph_end(self.parser.caret)
+
     def close(self, node):
         """Returns the position where the element was closed. """
         parser = self.parser
@@ -68,8 +72,7 @@ class ParagraphNP(NodeParser):
                 parser.update(match.end(0)-1)
                 return parser.copy_pos()
         if node.parent.name == 'list_item':
-            if (parser.text[caret+1:caret+3] == '%%' or
-                    parser.text[caret+1:caret+8] == '</list>' or (
+            if (parser.text.startswith(('%%', '</list>'), caret+1) or (
                     node.index == 0 and
                     parser.text[caret+1:caret+2] in '^+*')):
                 node['remove'] = 'true'
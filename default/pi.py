@@ -21,6 +21,7 @@ class ProcessingInstructionNP(NodeParser):
     `%%?PITarget` and `%%`. Note that the target of the
     `ProcessingInstruction` object that it returns has `?`
     preappended to it. """
+    trigger = '<%'
 
     def make_node(self):
         """Returns node if the parsers caret is not position at the
@@ -40,12 +41,13 @@ class ProcessingInstructionNP(NodeParser):
         """
         parser = self.parser
         caret = parser.caret
-        if parser.text[caret:caret+2] == '<?':
+        angle = parser['AngleNP']
+        if angle.classify(caret)[0] != angle.PI:
+            return None
+        if parser.text[caret] == '<':
             shift = 1
-        elif parser.text[caret:caret+3] == '%%?':
-            shift = 2
         else:
-            return None
+            shift = 2
         pos = parser.copy_pos()
         match = RE.search(parser.text, caret+shift)
         if match:
@@ -56,14 +58,18 @@ class ProcessingInstructionNP(NodeParser):
             parser.update(parser.end)
             return Text(content)
         if shift == 1:
-            index = parser.text.find('?>', match.end(0), parser.end)
+            index = parser['OpaqueNP'].find(
+                '?>', match.end(0), parser.end
+            )
             if index == -1:
                 self.msg('E101', pos, [target])
                 content = parser.text[match.end(0):parser.end]
                 parser.update(parser.end)
                 return ProcessingInstruction(target, content)
         else:
-            index = parser.text.find('%%', match.end(0), parser.end)
+            index = parser['OpaqueNP'].find(
+                '%%', match.end(0), parser.end
+            )
             if index == -1:
                 content = parser.text[match.end(0):parser.end]
                 parser.update(parser.end)
@@ -12,6 +12,7 @@ EMPTY = ' \t\n\r\f\v'
 
 class QuoteNP(NodeParser):
     """Looks for quotes. """
+    trigger = '\'"'
 
     def make_node(self):
         parser = self.parser
@@ -19,34 +20,40 @@ class QuoteNP(NodeParser):
         qchar = parser.text[caret:caret+1]
         if qchar not in "'\"":
             return None
-        if parser.text[caret-1] not in EMPTY:
+        if parser.text[caret-1:caret] not in EMPTY:
             parser.update(caret+1)
             return Entity(qchar)
         if parser.text[caret+1:caret+2] in EMPTY:
             parser.update(caret+1)
             return Entity(qchar)
-        index = parser.text.find(qchar, caret+1)
+        end = parser['LineNP'].window()
+        index = parser.text.find(qchar, caret+1, end)
         while index != -1:
             char = parser.text[index-1]
             if char == '\\':
-                index = parser.text.find(qchar, index+1)
+                index = parser.text.find(qchar, index+1, end)
             elif char not in EMPTY:
                 node = Element('quoted')
                 node.pos = parser.copy_pos()
                 node['char'] = qchar
-                node.end_pos = index
+                parser['StackNP'].push(node, index)
                 parser.update(parser.caret+1)
                 return node
             else:
                 break
-        parser.update(parser.end)
+        parser.update(caret+1)
         return Entity(qchar)
 
+    def close_at(self, node):
+        """The node closes at the closing quote. """
+        return self.parser['StackNP'].end(node)
+
     def close(self, node):
         parser = self.parser
-        if parser.caret != node.end_pos:
+        stack = parser['StackNP']
+        if parser.caret != stack.end(node):
             return None
-        del node.end_pos
+        stack.pop(node)
         pos = parser.copy_pos()
         parser.update(parser.caret+1)
         return pos
@@ -0,0 +1,141 @@
+"""LEXOR: RECORD
+
+Functions to turn the nodes and messages obtained by a parser into
+records that can be pickled, and back. A record is how a tree moves
+between processes and how it is stored on disk:
+
+    from lexor.command.lang import get_style_module
+    style = get_style_module('parser', 'lexor', 'default')
+    record = style.MOD['record']
+    entry = (parser.doc, list(parser.log.child), parser.log.modules, 1)
+    doc, log = record.load_document(record.dump_entry(entry), 'lexor',
+                                    'doc.lex')
+
+An entry is a tuple with a node whose children are the nodes of the
+record, the list of messages, the dictionary of the modules that
+explain the messages and the line where the nodes start.
+
+"""
+
+import sys
+from lexor.core.node import Node
+from lexor.core.elements import Document, DocumentFragment
+from lexor.core.elements import Element, Void
+from lexor.command.lang import map_explanations
+
+STRUCTURE_SLOTS = (
+    'owner', 'parent', 'index', 'prev', 'next', 'child', 'level',
+)
+
+
+def dump_entry(entry):
+    """Return a version of an entry that can be pickled. The nodes
+    are listed in preorder along with their number of children, the
+    modules are replaced by their names. The nodes of `id_dict` that
+    are not in the entry are listed after it. """
+    block, messages, modules, line = entry
+    order = dict()
+    nodes = list()
+    stack = list(reversed(block.child))
+    while True:
+        while stack:
+            node = stack.pop()
+            order[id(node)] = len(nodes)
+            nodes.append(_dump_node(node))
+            if node.child:
+                stack.extend(reversed(node.child))
+        stack = [
+            node for node in block.id_dict.values() if id(node) not in order
+        ][:1]
+        if not stack:
+            break
+    ids = [(key, order[id(node)]) for key, node in block.id_dict.items()]
+    messages = [
+        (msg['module'], msg['code'], msg['position'], msg['arg'])
+        for msg in messages
+    ]
+    return len(block.child), nodes, ids, messages, list(modules), line
+
+
+def load_entry(record):
+    """Create an entry from the output of `dump_entry`. """
+    total, nodes, ids, messages, modules, line = record
+    block = DocumentFragment()
+    created = list()
+    stack = [[block, total]]
+    for info in nodes:
+        node = _load_node(info)
+        created.append(node)
+        while stack and stack[-1][1] == 0:
+            stack.pop()
+        if stack:
+            stack[-1][1] -= 1
+            stack[-1][0].append_child(node)
+        if info[-1]:
+            stack.append([node, info[-1]])
+    block.id_dict = dict((key, created[num]) for key, num in ids)
+    log = list()
+    for module, code, position, arg in messages:
+        msg = Void('msg')
+        msg['module'] = module
+        msg['code'] = code
+        msg['position'] = position
+        msg['arg'] = arg
+        log.append(msg)
+    modules = dict((name, sys.modules[name]) for name in modules)
+    return block, log, modules, line
+
+
+def load_document(record, lang, uri):
+    """Return the document and the log of messages stored in a
+    record made by `dump_entry` from a whole document. """
+    block, messages, modules, _ = load_entry(record)
+    doc = Document(lang)
+    doc.uri_ = uri
+    ids = dict(block.id_dict)
+    for node in list(block.child):
+        doc.append_child(node)
+    doc.id_dict = ids
+    log = Document("lexor", "log")
+    log.modules = modules
+    log.explanation = dict()
+    for msg in messages:
+        msg['uri'] = uri
+        log.append_child(msg)
+    map_explanations(log.modules, log.explanation)
+    return doc, log
+
+
+def _node_slots(cls):
+    """Return the slots of a node class that hold values. """
+    if cls not in _node_slots.cache:
+        slots = list()
+        for base in cls.__mro__:
+            for slot in getattr(base, '__slots__', ()):
+                if slot not in STRUCTURE_SLOTS and slot not in slots:
+                    slots.append(slot)
+        _node_slots.cache[cls] = slots
+    return _node_slots.cache[cls]
+_node_slots.cache = dict()
+
+
+def _dump_node(node):
+    """Helper function for dump_entry. """
+    cls = type(node)
+    slots = [getattr(node, slot) for slot in _node_slots(cls)]
+    state = dict(node.__dict__) if isinstance(node, Element) else None
+    total = len(node.child) if node.child is not None else None
+    return cls, slots, state, total
+
+
+def _load_node(info):
+    """Helper function for load_entry. """
+    cls, slots, state, total = info
+    node = cls.__new__(cls)
+    Node.__init__(node)
+    for slot, val in zip(_node_slots(cls), slots):
+        setattr(node, slot, val)
+    if state is not None:
+        node.__dict__.update(state)
+    node.child = list() if total is not None else None
+    return node
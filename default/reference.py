@@ -3,12 +3,15 @@
 """
 
 import re
+from array import array
+from bisect import bisect_left
 from lexor.core.parser import NodeParser
 from lexor.core.elements import Void, Element
 
 RE = re.compile(r'\s+')
 RE_INLINE = re.compile(r'.*?[ \t\n\r\f\v)]')
 RE_NOSPACE = re.compile(r'.*?[ \t\n\r\f\v]')
+RE_BRACKET = re.compile(r'(?<!\\left)\[|(?<!\\right)\]')
 
 
 class ReferenceBlockNP(NodeParser):
@@ -53,7 +56,8 @@ class ReferenceBlockNP(NodeParser):
             line_end = parser.text.find('\n', caret)
             if line_end == -1 and parser.text[caret:].strip() != '':
                 line_end = parser.end
-                self.msg('E100', parser.compute(parser.end))
+                pos = parser['LineNP'].position(parser.end)
+                self.msg('E100', pos)
         index = parser.text.find(char, caret+1, line_end)
         if index == -1:
             return None
@@ -69,7 +73,7 @@ class ReferenceBlockNP(NodeParser):
         empty = 0
         index = parser.caret
         char = parser.text[index:index+1]
-        while char in ' \t':
+        while char and char in ' \t':
             if char == ' ':
                 empty += 1
             else:
@@ -89,7 +93,8 @@ class ReferenceBlockNP(NodeParser):
         line_end = parser.text.find('\n', ref_begin)
         if line_end == -1:
             line_end = parser.end
-            self.msg('E100', parser.compute(parser.end))
+            pos = parser['LineNP'].position(parser.end)
+            self.msg('E100', pos)
         index = parser.text.rfind(closing_char, ref_begin, line_end)
         if index == -1:
             return None
@@ -165,28 +170,34 @@ class ReferenceBlockNP(NodeParser):
         return node
 
 
+def match_brackets(text):
+    """Pair every `[` in the text with its closing `]` in one pass.
+    The brackets in `\\left[` and `\\right]` are not taken into
+    account. Returns the sorted offsets of the brackets that count
+    and a dictionary mapping each matched `[` to its `]`. """
+    offsets = array('l')
+    closing = dict()
+    stack = []
+    for match in RE_BRACKET.finditer(text):
+        index = match.start()
+        if text[index] == '[':
+            stack.append(index)
+        elif stack:
+            closing[stack.pop()] = index
+        offsets.append(index)
+    return offsets, closing
+
+
 def check_parity(parser, index):
     """Returns the parity of '[]' and the index where it ends. """
-    parity = 1
-    while index < parser.end:
-        char = parser.text[index]
-        prev_l = parser.text[index-5:index]
-        prev_r = parser.text[index-6:index]
-        if char == '[' and prev_l != '\\left':
-            parity += 1
-        elif char == ']' and prev_r != '\\right':
-            parity -= 1
-        if parity == 0:
-            break
-        index += 1
-    return parity, index
+    return parser['ReferenceInlineNP'].find_closing(index)
 
 
 def get_inline_id(parser, node):
     """Assumes that the parser is positioned at '['"""
     if parser.text[parser.caret:parser.caret+1] == '[':
         ref_begin = parser.caret+1
-    elif parser.text[parser.caret:parser.caret+2] == ' [':
+    elif parser.text.startswith(' [', parser.caret):
         ref_begin = parser.caret+2
     else:
         return
@@ -220,11 +231,47 @@ class ReferenceInlineNP(NodeParser):
         [Google]
 
     """
+    trigger = '!['
     active = False
 
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._offsets = None
+        self._closing = None
+
+    def find_closing(self, index):
+        """Look for the `]` that closes the bracket before `index`.
+        Returns a parity of 0 and the index of the `]` if it is found,
+        otherwise it returns a parity of 1 and `parser.end`. The
+        `]` must be inside of the block being parsed. The brackets are
+        matched once per document. """
+        parser = self.parser
+        if self._text is not parser.text:
+            self._text = parser.text
+            self._offsets, self._closing = match_brackets(parser.text)
+        end = parser['LineNP'].window()
+        if index-1 in self._closing:
+            if self._closing[index-1] < end:
+                return 0, self._closing[index-1]
+            return 1, parser.end
+        num = bisect_left(self._offsets, index)
+        while num < len(self._offsets):
+            offset = self._offsets[num]
+            if offset >= end:
+                break
+            if parser.text[offset] == ']':
+                return 0, offset
+            if offset not in self._closing:
+                break
+            num = bisect_left(self._offsets, self._closing[offset]+1)
+        return 1, parser.end
+
     def get_inline_info(self, parser, node):
         """Assumes that the parser is positioned at ("""
-        end_info = parser.text.find(")", parser.caret+1, parser.end)
+        end_info = parser.text.find(
+            ")", parser.caret+1, parser['LineNP'].window()
+        )
         if end_info == -1:
             self.msg('E103', node['_pos'], parser.copy_pos())
             node.name = 'failed_%s' % node.name
@@ -285,25 +332,31 @@ class ReferenceInlineNP(NodeParser):
         node = Element('reference')
         node.pos = parser.copy_pos()
         node['_pos'] = parser.copy_pos()
-        node.ref_end = ref_end
+        parser['StackNP'].push(node, ref_end)
         parser.update(parser.caret+1)
         return node
 
+    def close_at(self, node):
+        """The node closes at the matching `]`. """
+        return self.parser['StackNP'].end(node)
+
     def close(self, node):
         parser = self.parser
-        if parser.caret != node.ref_end:
+        stack = parser['StackNP']
+        ref_end = stack.end(node)
+        if parser.caret != ref_end:
             return None
+        stack.pop(node)
         parser.update(parser.caret+1)
-        char = parser.text[node.ref_end+1:node.ref_end+2]
+        char = parser.text[ref_end+1:ref_end+2]
         if char == '(':
             node.name = 'a'
             self.get_inline_info(parser, node)
         elif char in '[ ':
             get_inline_id(parser, node)
         else:
-            parser.update(node.ref_end+1)
+            parser.update(ref_end+1)
         parser['ElementNP'].get_attribute_list(parser, node)
-        del node.ref_end
         return parser.copy_pos()
 
 MSG = {
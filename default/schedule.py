@@ -0,0 +1,139 @@
+"""LEXOR: SCHEDULE NodeParser
+
+At every position of the caret the parser asks each node in progress,
+from the innermost to the outermost, if it closes there. Most node
+parsers know in advance where their nodes may close, either at a
+single offset or only at some characters. This module provides the
+node parser that uses that information to skip the calls to `close`
+that cannot succeed. It is installed unless the parser is created
+with the option `schedule` set to `off` or the version of lexor is
+not supported by the `compat` module.
+
+"""
+
+from lexor.util import Position
+from lexor.core.parser import NodeParser
+
+
+class ScheduleNP(NodeParser):
+    """Replaces the method of the parser that closes the nodes in
+    progress. A node parser declares where its nodes may close in one
+    of two ways:
+
+        class ParagraphNP(NodeParser):
+            closes_on = '\\n<%'
+
+        class QuoteNP(NodeParser):
+            def close_at(self, node):
+                return self.parser['StackNP'].end(node)
+
+    With `closes_on` the `close` method is only called when the
+    character at the caret is one of the given characters. With
+    `close_at` it is only called when the caret is at the offset
+    returned, which must not change while the node is in progress.
+    Node parsers that declare neither are called at every position.
+    The plan of a node is computed once, when the node is opened. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._stack = None
+        self._plan = list()
+        self._always = 0
+        self._offsets = dict()
+        self._chars = dict()
+        self._compat = parser.style_module.MOD['compat']
+
+    def install(self):
+        """Make the parser use `close_node` to close its nodes. Nothing
+        is changed if the version of lexor is not supported, see the
+        `compat` module. """
+        self._compat.install_close_node(self.parser, self.close_node)
+
+    def _push(self, node, processor):
+        """Add the plan of a node that was opened. """
+        if hasattr(processor, 'owner'):
+            processor = processor.owner(node)
+        offset, closes_on = None, None
+        close_at = getattr(processor, 'close_at', None)
+        if close_at is not None:
+            offset = close_at(node)
+            self._offsets[offset] = self._offsets.get(offset, 0) + 1
+        else:
+            closes_on = getattr(processor, 'closes_on', None)
+            if closes_on is None:
+                self._always += 1
+            for char in closes_on or '':
+                self._chars[char] = self._chars.get(char, 0) + 1
+        self._plan.append((node, offset, closes_on))
+
+    def _pop(self):
+        """Remove the plan of the innermost node. """
+        _, offset, closes_on = self._plan.pop()
+        if offset is not None:
+            self._offsets[offset] -= 1
+            if self._offsets[offset] == 0:
+                del self._offsets[offset]
+        elif closes_on is None:
+            self._always -= 1
+        else:
+            for char in closes_on:
+                self._chars[char] -= 1
+                if self._chars[char] == 0:
+                    del self._chars[char]
+
+    def _update(self, stack):
+        """Bring the plan up to date with the nodes in `stack`. Nodes
+        are only opened and closed at the end of the stack, so the
+        plan is kept up to the last node that is still in it. """
+        plan = self._plan
+        if stack is not self._stack:
+            self._stack = stack
+            while plan:
+                self._pop()
+        while len(plan) > len(stack) or (
+                plan and plan[-1][0] is not stack[len(plan)-1][0]):
+            self._pop()
+        while len(plan) < len(stack):
+            self._push(*stack[len(plan)])
+
+    def close_node(self):
+        """Same as `Parser._close_node` but the nodes that cannot
+        close at the caret are skipped. Returns the new current node
+        if a node was closed, otherwise None. """
+        parser = self.parser
+        stack = self._compat.in_progress(parser)
+        self._update(stack)
+        caret = parser.caret
+        char = parser.text[caret:caret+1]
+        if not (self._always or caret in self._offsets or
+                char in self._chars):
+            return None
+        num = len(stack)
+        autoclose = None
+        while num > 0:
+            num -= 1
+            _, offset, closes_on = self._plan[num]
+            if offset is not None:
+                if offset != caret:
+                    continue
+            elif closes_on is not None and not (char and char in closes_on):
+                continue
+            node, processor = stack[num]
+            autoclose = processor.close(node)
+            if autoclose is not None:
+                break
+        if autoclose is None:
+            return None
+        for index in xrange(len(stack)-1, num, -1):
+            parser.msg(
+                parser.__module__, 'W100', stack[index][0].node_position,
+                (stack[index][0].name, Position(autoclose))
+            )
+            del stack[index]
+        del stack[num]
+        if stack:
+            return stack[-1][0]
+        return parser.doc
+
+    def make_node(self):
+        return None
@@ -0,0 +1,187 @@
+"""LEXOR: SPAN NodeParser
+
+The text of a document ends up copied into the nodes of its tree. A
+consumer that only looks at the structure of the tree, such as a link
+checker or a table of contents builder, never reads most of those
+copies. This module provides the node parser that lets the nodes
+refer to their span of the document instead. The span is copied the
+first time the data of the node is read. It is installed when the
+parser is created with the option `lazy` set to `on`:
+
+    parser = Parser('lexor', 'default', {'lazy': 'on'})
+
+A tree made in this way keeps the text of the document alive until
+the data of all of its nodes has been read.
+
+"""
+
+from lexor.core.parser import NodeParser
+from lexor.core.elements import CharacterData, Text, RawText, Comment, CData
+
+# Shortest content kept as a span. A `Span` and its offsets take about
+# as much memory as a string of 100 characters, shorter content is
+# copied right away.
+MIN_SPAN = 128
+
+
+class Span(object):
+    """The part `source[start:end]` of a text. If `transform` is not
+    None it is called with the part to obtain the value of the
+    span. """
+
+    __slots__ = ('source', 'start', 'end', 'transform')
+
+    def __init__(self, source, start, end, transform=None):
+        self.source = source
+        self.start = start
+        self.end = end
+        self.transform = transform
+
+    def value(self):
+        """Return the part of the text covered by the span. """
+        data = self.source[self.start:self.end]
+        if self.transform is not None:
+            data = self.transform(data)
+        return data
+
+
+class SpanData(object):
+    """Mixin for the character data nodes whose `data` may be a
+    `Span`. The span is replaced by its value when `data` is read. """
+
+    __slots__ = ()
+
+    def _get_data(self):
+        """Return the data of the node. """
+        data = CharacterData.data.__get__(self, CharacterData)
+        # Not `isinstance(data, Span)`: a parser created later reloads
+        # this module and the nodes made before hold the old `Span`.
+        if not isinstance(data, basestring):
+            data = data.value()
+            CharacterData.data.__set__(self, data)
+        return data
+
+    def _set_data(self, value):
+        """Set the data of the node. """
+        CharacterData.data.__set__(self, value)
+
+    data = property(_get_data, _set_data)
+
+
+class SpanText(SpanData, Text):
+    """A `Text` node whose data may be a `Span`. """
+    __slots__ = ()
+
+
+class SpanRawText(SpanData, RawText):
+    """A `RawText` element whose data may be a `Span`. """
+    __slots__ = ()
+
+
+class SpanComment(SpanData, Comment):
+    """A `Comment` node whose data may be a `Span`. """
+    __slots__ = ()
+
+
+class SpanCData(SpanData, CData):
+    """A `CData` node whose data may be a `Span`. """
+    __slots__ = ()
+
+
+LAZY = {
+    Text: SpanText,
+    RawText: SpanRawText,
+    Comment: SpanComment,
+    CData: SpanCData,
+}
+
+
+class SpanNP(NodeParser):
+    """Creates the character data nodes of the other node parsers.
+    This node parser does not create nodes by itself. A node parser
+    obtains the content of a node and the node with
+
+        spans = parser['SpanNP']
+        node = spans.new(Comment, spans.span(start, end, transform))
+
+    which, until `install` is called, is the same as
+
+        node = Comment(transform(parser.text[start:end]))
+
+    Once installed, the nodes are of the classes in `LAZY` and the
+    data of the ones with at least `MIN_SPAN` characters are spans of
+    the text. The runs of text between the nodes are also kept as
+    spans, consecutive runs share one span. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self.lazy = False
+        self._compat = parser.style_module.MOD['compat']
+
+    def install(self):
+        """Make the nodes refer to the text instead of copying it. The
+        runs of text between the nodes are still copied if the version
+        of lexor is not supported, see the `compat` module. """
+        self.lazy = True
+        self._compat.install_process_text(self.parser, self.process_text)
+
+    def span(self, start, end, transform=None):
+        """Return the content of a node made of the text from `start`
+        to `end` passed through `transform`. The content is a `Span`
+        if the node parser is installed and the text is at least
+        `MIN_SPAN` characters long, otherwise a string. """
+        if self.lazy and end - start >= MIN_SPAN:
+            return Span(self.parser.text, start, end, transform)
+        data = self.parser.text[start:end]
+        if transform is not None:
+            data = transform(data)
+        return data
+
+    def new(self, cls, *args):
+        """Return `cls(*args)` or, if the node parser is installed
+        and `cls` has a lazy version, an instance of that version. """
+        if self.lazy:
+            cls = LAZY.get(cls, cls)
+        return cls(*args)
+
+    def process_text(self, crt):
+        """Same as `Parser._process_text` but the text is appended to
+        `crt` as a span. """
+        parser = self.parser
+        index = self._compat.next_check(parser, crt)
+        if index == -1:
+            index = parser.end
+        elif index == parser.caret:
+            index += 1
+        pos = parser.copy_pos()
+        start = parser.caret
+        parser.update(index)
+        if len(crt) > 0 and isinstance(crt[-1], Text):
+            self._extend(crt[-1], start, index)
+        else:
+            crt.append_child(self.new(Text, self.span(start, index)))
+            crt[-1].set_position(*pos)
+
+    def _extend(self, node, start, end):
+        """Append the text from `start` to `end` to the data of a text
+        node. If the node holds the span that ends at `start` then the
+        span is extended. A lazy node holding a string that is the
+        text right before `start` gets a span once it is long
+        enough. """
+        text = self.parser.text
+        data = CharacterData.data.__get__(node, CharacterData)
+        if not isinstance(data, basestring):
+            if (data.transform is None and data.end == start and
+                    data.source is text):
+                data.end = end
+                return
+        elif isinstance(node, SpanData):
+            begin = start - len(data)
+            if (end - begin >= MIN_SPAN and begin >= 0 and
+                    text.startswith(data, begin)):
+                node.data = Span(text, begin, end)
+                return
+        node.data += text[start:end]
+
+    def make_node(self):
+        return None
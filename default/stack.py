@@ -0,0 +1,92 @@
+"""LEXOR: STACK NodeParser
+
+The node parsers that know where their nodes close, or that need
+some other value to close them, keep these values here instead of
+storing them on the nodes. The values of the nodes in progress are
+kept in parallel arrays, one entry per node, in the order in which
+the nodes were opened.
+
+"""
+
+from array import array
+from lexor.core.parser import NodeParser
+
+
+class StackNP(NodeParser):
+    """Keeps, for each node in progress that was pushed, the offset
+    where it closes and any other data its node parser needs in order
+    to close it:
+
+        class QuoteNP(NodeParser):
+            def make_node(self):
+                ...
+                parser['StackNP'].push(node, index)
+                return node
+
+            def close(self, node):
+                stack = self.parser['StackNP']
+                if self.parser.caret != stack.end(node):
+                    return None
+                stack.pop(node)
+                ...
+
+    The offset is -1 if it is not known in advance. A node is popped
+    along with the nodes pushed after it, these are closed with it.
+    The entries of the nodes that are no longer in progress, for
+    instance the ones that the parser closed automatically, are
+    dropped when another node is pushed. """
+
+    def __init__(self, parser):
+        NodeParser.__init__(self, parser)
+        self._text = None
+        self._nodes = list()
+        self._ends = array('l')
+        self._data = list()
+
+    def push(self, node, end, data=None):
+        """Record the values of `node`, a node about to be returned by
+        `make_node` as a child of the current node. """
+        parser = self.parser
+        if self._text is not parser.text:
+            self._text = parser.text
+            self._truncate(0)
+        nodes = self._nodes
+        while nodes:
+            crt = parser.current_node
+            while crt is not None and crt is not nodes[-1]:
+                crt = crt.parent
+            if crt is not None:
+                break
+            self._truncate(len(nodes)-1)
+        nodes.append(node)
+        self._ends.append(end)
+        self._data.append(data)
+
+    def _find(self, node):
+        """Return the index of the entry of `node`. """
+        for num in xrange(len(self._nodes)-1, -1, -1):
+            if self._nodes[num] is node:
+                return num
+        raise KeyError(id(node))
+
+    def _truncate(self, num):
+        """Drop the entries from the index `num` onwards. """
+        del self._nodes[num:]
+        del self._ends[num:]
+        del self._data[num:]
+
+    def end(self, node):
+        """Return the offset where `node` closes. """
+        return self._ends[self._find(node)]
+
+    def data(self, node):
+        """Return the data pushed with `node`. """
+        return self._data[self._find(node)]
+
+    def pop(self, node):
+        """Drop the entry of `node`, which is being closed, along with
+        the entries of the nodes pushed after it. """
+        self._truncate(self._find(node))
+
+    def make_node(self):
+        return None
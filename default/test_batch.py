@@ -0,0 +1,74 @@
+"""LEXOR: DEFAULT parser BATCH test
+
+Testing suite to parse many lexor documents at once in the default
+style.
+
+"""
+
+import os
+import shutil
+import tempfile
+from nose.tools import eq_
+from testing import check as check_doc
+from lexor.command.lang import get_style_module
+
+DOCS = [
+    'Intro paragraph with *emphasis*.\n\n'
+    '# Header {id=top}\n\n'
+    '<div><p>one<p>two</div>\n\n'
+    '~~~~\ncode\n\nmore code\n~~~~\n\n'
+    '%%{list}\n+ item *a*\n+ item "b\n\nc"\n%%\n\n'
+    'A [link][ref] and $x$.\n\n'
+    '[ref]: http://example.com\n',
+    '<div>\n\nunclosed\n\n<p>paragraph\n\nend\n',
+    '',
+    'A single line',
+]
+
+
+def batch_parser(**kwargs):
+    """Return a `BatchParser`. """
+    style = get_style_module('parser', 'lexor', 'default')
+    return style.MOD['batch'].BatchParser(**kwargs)
+
+
+def check(result, text, uri):
+    """Compare a `BatchResult` with the result of parsing `text` with
+    a `Parser`. """
+    eq_(result.error, None)
+    expected = check_doc(result.doc, result.log, text, uri)
+    eq_(result.uri, expected.doc.uri_)
+    eq_(result.log.explanation.keys(),
+        expected.lexor_log.explanation.keys())
+
+
+def test_batch_texts():
+    """lexor.parser.default.batch: texts in order """
+    for processes in (0, 2):
+        parser = batch_parser(processes=processes)
+        results = list(parser.iterparse(DOCS))
+        eq_([result.index for result in results], range(len(DOCS)))
+        for result, text in zip(results, DOCS):
+            check(result, text, result.uri)
+
+
+def test_batch_paths():
+    """lexor.parser.default.batch: files, unordered and missing """
+    path = tempfile.mkdtemp(prefix='lexor-batch-')
+    try:
+        names = list()
+        for num, text in enumerate(DOCS):
+            names.append(os.path.join(path, 'doc%d.lex' % num))
+            with open(names[-1], 'w') as tmp:
+                tmp.write(text)
+        names.append(os.path.join(path, 'missing.lex'))
+        parser = batch_parser(processes=2, chunksize=2)
+        results = parser.iterparse(names, paths=True, ordered=False)
+        results = sorted(results, key=lambda result: result.index)
+        eq_([result.index for result in results], range(len(names)))
+        for result, text, name in zip(results, DOCS, names):
+            check(result, text, name)
+        eq_(results[-1].doc, None)
+        eq_('IOError' in results[-1].error, True)
+    finally:
+        shutil.rmtree(path, True)
@@ -0,0 +1,129 @@
+"""LEXOR: DEFAULT parser CACHE test
+
+Testing suite to parse lexor documents through the cache in the
+default style.
+
+"""
+
+import os
+import zlib
+import shutil
+import tempfile
+import cPickle as pickle
+from nose.tools import eq_
+from testing import check as check_doc
+from lexor.command.lang import get_style_module
+
+DOCS = [
+    'Intro paragraph with *emphasis*.\n\n'
+    '# Header {id=top}\n\n'
+    '<div><p>one<p>two</div>\n\n'
+    '~~~~\ncode\n\nmore code\n~~~~\n\n'
+    '%%{list}\n+ item *a*\n+ item "b\n\nc"\n%%\n\n'
+    'A [link][ref] and $x$.\n\n'
+    '[ref]: http://example.com\n',
+    '<div>\n\nunclosed\n\n<p>paragraph\n\nend\n',
+]
+
+
+def cached_parser(path, **kwargs):
+    """Return a `CachedParser` keeping its files in `path`. """
+    style = get_style_module('parser', 'lexor', 'default')
+    return style.MOD['cache'].CachedParser(path=path, **kwargs)
+
+
+def check(parser, text):
+    """Parse `text` with `parser` and with a `Parser` and compare the
+    documents and the messages. """
+    parser.parse(text, 'doc.lex')
+    expected = check_doc(parser.doc, parser.lexor_log, text, 'doc.lex')
+    eq_(sorted(parser.lexor_log.modules),
+        sorted(expected.lexor_log.modules))
+    eq_(parser.lexor_log.explanation.keys(),
+        expected.lexor_log.explanation.keys())
+
+
+def test_cache_hit_miss():
+    """lexor.parser.default.cache: misses and hits """
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = cached_parser(path)
+        for doc in DOCS:
+            check(parser, doc)
+        eq_((parser.misses, parser.hits), (len(DOCS), 0))
+        for doc in DOCS:
+            check(parser, doc)
+        eq_((parser.misses, parser.hits), (len(DOCS), len(DOCS)))
+        parser = cached_parser(path)
+        for doc in DOCS:
+            check(parser, doc)
+        eq_((parser.misses, parser.hits), (0, len(DOCS)))
+    finally:
+        shutil.rmtree(path, True)
+
+
+def test_cache_invalidation():
+    """lexor.parser.default.cache: changed text and options """
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = cached_parser(path)
+        check(parser, DOCS[0])
+        check(parser, DOCS[0] + '\nOne more line.\n')
+        eq_((parser.misses, parser.hits), (2, 0))
+        other = cached_parser(path, defaults={'inline': 'on'})
+        other.parse(DOCS[0])
+        eq_((other.misses, other.hits), (1, 0))
+        for name in os.listdir(path):
+            with open(os.path.join(path, name), 'wb') as tmp:
+                tmp.write('corrupted')
+        check(parser, DOCS[0])
+        eq_((parser.misses, parser.hits), (3, 0))
+        check(parser, DOCS[0])
+        eq_((parser.misses, parser.hits), (3, 1))
+        invalid = zlib.compress(pickle.dumps((('record',), 0, [1, 1])))
+        for name in os.listdir(path):
+            with open(os.path.join(path, name), 'wb') as tmp:
+                tmp.write(invalid)
+        check(parser, DOCS[0])
+        eq_((parser.misses, parser.hits), (4, 1))
+        check(parser, DOCS[0])
+        eq_((parser.misses, parser.hits), (4, 2))
+    finally:
+        shutil.rmtree(path, True)
+
+
+def test_cache_limit():
+    """lexor.parser.default.cache: least recently used files removed """
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = cached_parser(path, limit=4096)
+        for num in range(20):
+            check(parser, DOCS[0] * (num + 1))
+        size = sum(
+            os.path.getsize(os.path.join(path, name))
+            for name in os.listdir(path)
+        )
+        eq_(size <= 4096, True)
+    finally:
+        shutil.rmtree(path, True)
+
+
+def test_cache_evict():
+    """lexor.parser.default.cache: directory measured past the limit """
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = cached_parser(path, limit=16384)
+        calls = list()
+        evict = parser.evict
+        parser.evict = lambda: calls.append(evict())
+        for num in range(40):
+            parser.parse(DOCS[0] + 'Line %d.\n' % num)
+        size = sum(
+            os.path.getsize(os.path.join(path, name))
+            for name in os.listdir(path)
+        )
+        eq_(size <= 16384, True)
+        eq_(size, parser._size)
+        eq_(len(calls) < 20, True)
+    finally:
+        shutil.rmtree(path, True)
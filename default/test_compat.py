@@ -0,0 +1,67 @@
+"""LEXOR: DEFAULT parser COMPAT test
+
+Testing suite to parse lexor with and without the replacements of the
+main parsing loop in the default style.
+
+"""
+
+import lexor.__version__ as version
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from testing import dump, messages
+
+DOCS = [
+    'A `code\n\nspan` here and *em\n\nem* and [ref\n\nx](y)\n',
+    'He said "hello\n\nworld" and \'x\' ok _a_ **c** [a](b "t")\n',
+    '# Header *a*\n\nPara $1 and $2\n\n$x$ and \\(y\\)\n',
+    '<div><p>one *two<p>three* four</div>\n\n'
+    '%%{list}\n+ item *a*\n+ item "b\n\nc"\n%%\n',
+    '<div>\n\nunclosed\n\n<p>paragraph\n\nend\n',
+]
+
+
+def parse_all(defaults=None):
+    """Return the documents and messages obtained from `DOCS`. """
+    result = list()
+    parser = Parser('lexor', 'default', defaults)
+    for text in DOCS:
+        parser.parse(text)
+        result.append(dump(parser.doc))
+        result.append(messages(parser.lexor_log, uri=False))
+    return result
+
+
+def compat(parser):
+    """Return the compatibility module of the style of `parser`. """
+    parser.load_node_parsers()
+    return parser.style_module.MOD['compat']
+
+
+def test_compat_version():
+    """lexor.parser.default.compat: supported versions """
+    mod = compat(Parser('lexor', 'default'))
+    eq_(mod.ENABLED, True)
+    eq_(mod.is_supported((0, 1, 5, 'rc', 0)), True)
+    eq_(mod.is_supported((0, 1, 0, 'final', 0)), True)
+    eq_(mod.is_supported((0, 2, 0, 'final', 0)), False)
+    eq_(mod.is_supported((1, 0, 0, 'final', 0)), False)
+
+
+def test_compat_unsupported():
+    """lexor.parser.default.compat: same documents without replacements """
+    expected = parse_all({'schedule': 'off'})
+    eq_(parse_all(), expected)
+    eq_(parse_all({'lazy': 'on'}), expected)
+    installed = version.VERSION_INFO
+    version.VERSION_INFO = (0, 2, 0, 'final', 0)
+    try:
+        parser = Parser('lexor', 'default')
+        mod = compat(parser)
+        eq_(mod.ENABLED, False)
+        eq_(mod.install_close_node(parser, None), False)
+        eq_(mod.install_process_text(parser, None), False)
+        eq_(mod.in_progress(parser), ())
+        eq_(parse_all(), expected)
+        eq_(parse_all({'lazy': 'on'}), expected)
+    finally:
+        version.VERSION_INFO = installed
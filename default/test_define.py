@@ -4,7 +4,16 @@ Testing suite to parse lexor define in the default style.
 
 """
 
+import shutil
+import tempfile
+import lexor
+from StringIO import StringIO
+from collections import OrderedDict
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
 from lexor.command.test import nose_msg_explanations
+from testing import messages
 
 
 def test_define():
@@ -12,3 +21,105 @@ def test_define():
     nose_msg_explanations(
         'lexor', 'parser', 'default', 'define'
     )
+
+
+def _table():
+    """Return an empty `MacroTable`. """
+    mod = get_style_module('parser', 'lexor', 'default')
+    lexor.load_aux(mod.INFO)
+    return mod.MOD['define'].MacroTable()
+
+
+def _codes(text):
+    """Return the codes of the messages issued while parsing `text`. """
+    parser = Parser('lexor', 'default')
+    parser.parse(text)
+    return [node['code'] for node in parser.lexor_log.child]
+
+
+def test_arguments():
+    """lexor.parser.default.define: commas in the last argument """
+    table = _table()
+    table.define('\\SET', 'set_delayed', r'\left\{:exp:\right\}',
+                 {'exp': ''})
+    eq_(table.expand(r'\SET{a, b}'), r'\left\{a, b\right\}')
+    table.define('\\F', 'set_delayed', ':p: - :q:',
+                 OrderedDict([('p', '1'), ('q', '2')]))
+    eq_(table.expand(r'\F{a, b, c}'), 'a - b, c')
+    eq_(table.expand(r'\F{a, {b, c}}'), 'a - {b, c}')
+
+
+def test_defaults():
+    """lexor.parser.default.define: empty arguments take the default """
+    table = _table()
+    table.define('\\F', 'set_delayed', ':p: - :q:',
+                 OrderedDict([('p', '1'), ('q', '2')]))
+    eq_(table.expand(r'\F{}'), '1 - 2')
+    eq_(table.expand(r'\F{3}'), '3 - 2')
+    eq_(table.expand(r'\F{, 5}'), '1 - 5')
+    eq_(table.expand(r'\F{3, 5}'), '3 - 5')
+
+
+def test_cycles():
+    """lexor.parser.default.define: macros defined in terms of themselves """
+    table = _table()
+    eq_(table.define('a', 'set_delayed', 'a + 1'), ['a', 'a'])
+    eq_(table.define('b', 'set_delayed', 'c + 1'), None)
+    eq_(table.define('c', 'set_delayed', 'b + 1'), ['c', 'b', 'c'])
+    table = _table()
+    eq_(table.define('a', 'set_delayed', 'b + 1'), None)
+    eq_(table.define('b', 'set_delayed', 'c'), None)
+    eq_(table.define('c', 'set_delayed', 'a'), ['c', 'a', 'b', 'c'])
+    eq_(list(table.macros), ['a', 'b'])
+    eq_(_codes('%%{define}\na := a + 1\n%%\n'), ['E102'])
+    eq_(_codes('%%{define}\na := b + 1\nb := a + 1\n%%\n'), ['E102'])
+    eq_(_codes('%%{define}\na := b\nb := c\nc := a\n%%\n'), ['E102'])
+    eq_(_codes('%%{define}\na := b\nb := c\nc = 1\n%%\n'), [])
+
+
+def test_redefine():
+    """lexor.parser.default.define: `=` and `:=` after a redefinition """
+    table = _table()
+    table.define('x', 'set', '1')
+    table.define('y', 'set', 'x')
+    table.define('z', 'set_delayed', 'x')
+    eq_(table.expand('x y z'), '1 1 1')
+    table.define('x', 'set', '2')
+    eq_(table.expand('x y z'), '2 1 2')
+    eq_(table.define('x', 'set', 'x + 1'), None)
+    eq_(table.expand('x y z'), '2 + 1 1 2 + 1')
+
+
+def _parse(parser, text):
+    """Parse `text` with `parser` and return the names of the macros
+    and the messages. """
+    parser.parse(text, 'doc.lex')
+    return (list(parser['MacroNP'].table.macros),
+            messages(parser.lexor_log))
+
+
+def test_define_blocks():
+    """lexor.parser.default.define: macros declared in other blocks """
+    mod = get_style_module('parser', 'lexor', 'default')
+    path = tempfile.mkdtemp(prefix='lexor-define-')
+    texts = [
+        'x\n\n%%{define}\na := b + 1\n%%\n\ny\n\n%%{define}\nb := a\n%%\n',
+        'x\n\n%%{define}\na := 1\n%%\n\ny\n\n%%{define}\nb := a\n%%\n',
+        'x\n\n%%{define}\na := b\n%%\n\ny\n\n%%{define}\nb := a\n%%\n',
+    ]
+    try:
+        parsers = [
+            mod.MOD['incremental'].IncrementalParser(),
+            mod.MOD['cache'].CachedParser(path=path),
+            mod.MOD['cache'].CachedParser(path=path),
+        ]
+        for text in texts * 2:
+            expected = _parse(Parser('lexor', 'default'), text)
+            for parser in parsers:
+                eq_(_parse(parser, text), expected)
+            parser = mod.MOD['incremental'].StreamParser()
+            list(parser.iterparse(StringIO(text), 'doc.lex', 8))
+            eq_(messages(parser.lexor_log), expected[1])
+        eq_(parsers[2].hits, len(texts) * 2)
+    finally:
+        shutil.rmtree(path, True)
@@ -0,0 +1,55 @@
+"""LEXOR: DEFAULT parser DISPATCH test
+
+Testing suite to dispatch the lexor node parsers of the `__default__`
+context in the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+
+TEXT = (
+    'Text with *em*, **strong**, _smart_, "quotes", `code`, $x$,\n'
+    '[a link](http://x.com), <http://auto.com>, <me@x.com>, &amp;,\n'
+    '<span>element</span> <!-- comment --> <![CDATA[data]]> \\\\ end.\n'
+)
+
+
+def test_dispatch_table():
+    """lexor.parser.default.dispatch: table of the __default__ context """
+    parser = Parser('lexor', 'default')
+    parser.load_node_parsers()
+    names = parser.style_module.INLINE
+    dispatch = parser['DispatchNP']
+    nodeparsers = [parser[name] for name in names]
+    default = [
+        item for item in nodeparsers if getattr(item, 'trigger', None) is None
+    ]
+    eq_(dispatch.default, default)
+    chars = set(''.join(
+        getattr(item, 'trigger', None) or '' for item in nodeparsers
+    ))
+    eq_(set(dispatch.table), chars)
+    for char in chars:
+        eq_(dispatch.table[char], [
+            item for item in nodeparsers
+            if getattr(item, 'trigger', None) is None or
+            char in item.trigger
+        ])
+
+
+def test_dispatch_triggers():
+    """lexor.parser.default.dispatch: no node outside of the triggers """
+    parser = Parser('lexor', 'default')
+    parser.parse(TEXT)
+    nodeparsers = [
+        parser[name] for name in parser.style_module.INLINE
+        if getattr(parser[name], 'trigger', None) is not None
+    ]
+    for caret, char in enumerate(TEXT):
+        for nodeparser in nodeparsers:
+            if char in nodeparser.trigger:
+                continue
+            parser.caret = caret
+            eq_(nodeparser.make_node(), None)
+            eq_(parser.caret, caret)
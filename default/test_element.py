@@ -4,11 +4,44 @@ Testing suite to parse lexor element in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
 from lexor.command.test import nose_msg_explanations
 
+# Text, names and data of the nodes of the documents and codes of the
+# messages issued while parsing them.
+CLOSE = [
+    ('<div>x</div>\n', [('div', [('#text', 'x')]), ('#text', '\n')], []),
+    ('%%{div}x%%\n', [('div', [('#text', 'x')]), ('#text', '\n')], []),
+    ('<div>a\n\nb</div>\n',
+     [('div', [('#text', 'a\n\nb')]), ('#text', '\n')], []),
+    ('<ul><li>a<li>b</ul>\n',
+     [('ul', [('li', [('#text', 'a')]), ('li', [('#text', 'b')])]),
+      ('#text', '\n')], ['W100']),
+    ('<p>a<p>b\n', [('p', [('#text', 'a')]), ('p', [('#text', 'b\n')])],
+     ['E100']),
+]
+
 
 def test_element():
     """lexor.parser.default.element: MSG_EXPLANATION """
     nose_msg_explanations(
         'lexor', 'parser', 'default', 'element'
     )
+
+
+def tree(node):
+    """Return the names and data of the children of `node`. """
+    return [
+        (item.name, tree(item) if item.child is not None else item.data)
+        for item in node.child
+    ]
+
+
+def test_element_close():
+    """lexor.parser.default.element: closing and auto-closed tags """
+    for text, nodes, codes in CLOSE:
+        parser = Parser('lexor', 'default')
+        parser.parse(text)
+        eq_(tree(parser.doc), nodes)
+        eq_([msg['code'] for msg in parser.lexor_log.child], codes)
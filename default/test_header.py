@@ -4,6 +4,8 @@ Testing suite to parse lexor header in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
 from lexor.command.test import nose_msg_explanations
 
 
@@ -12,3 +14,18 @@ def test_header():
     nose_msg_explanations(
         'lexor', 'parser', 'default', 'header'
     )
+
+
+def test_header_attributes():
+    """lexor.parser.default.header: attributes named as parser fields """
+    parser = Parser('lexor', 'default')
+    tests = [
+        ('# Title {att=v}\n', [('att', 'v')]),
+        ('Title {att=v left_b=2}\n=====\n', [('att', 'v'), ('left_b', '2')]),
+        ('#{att=a} Title {final_pos=3}\n', [('att', 'a'), ('final_pos', '3')]),
+    ]
+    for text, expected in tests:
+        parser.parse(text)
+        node = parser.doc[0]
+        eq_([(key, node[key]) for key in node.attributes], expected)
+        eq_(node[0].data.strip(), 'Title')
@@ -0,0 +1,122 @@
+"""LEXOR: DEFAULT parser INCREMENTAL test
+
+Testing suite to parse lexor documents in pieces in the default
+style.
+
+"""
+
+import random
+from StringIO import StringIO
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from testing import dump, messages
+from testing import check as check_doc
+from lexor.command.lang import get_style_module
+
+DOCS = [
+    'Intro paragraph with *emphasis*.\n\n'
+    '# Header {id=top}\n\n'
+    '<div><p>one<p>two</div>\n\n'
+    '~~~~\ncode\n\nmore code\n~~~~\n\n'
+    '<!-- a comment\n\nover two blocks -->\n\n'
+    '%%{list}\n+ item *a*\n+ item "b\n\nc"\n%%\n\n'
+    'A [link][ref] and $x$.\n\n'
+    '[ref]: http://example.com\n',
+    '<div>\n\nunclosed\n\n<p>paragraph\n\nend\n',
+    '"Quoted" _first_ <pre>[a\n\nb] `c\n\n d`</pre> *e\n\nf*\n',
+    '_s_ first\n\n<m@a.b\n\nb c "[\n\n<m@a.b\n\n\n',
+    '<pre>[a</pre>\n\n<div>*b</div>\n\nc\n',
+]
+# Pieces of the documents parsed from streams read in chunks of random
+# sizes. Some of them open constructs that are closed several blocks
+# later, or never.
+PIECES = [
+    '# Title', 'text here', '*em*', '*', '**', '_s_', '_', '`code`', '`',
+    '"q"', '"', "'", '$x$', '$', '[a](b)', '[', ']', '(', ')', '<m@a.b>',
+    '<m@a.b', '<div>', '</div>', '<pre>', '</pre>', '<!-- note', '-->',
+    '&amp;', '\\(', '\\)', '~~~~', '%%{b}', '%%', '    code', '+ item',
+    '> quote', '[r]', '[r]: http://z', '{', '}', '<', '>',
+]
+SEPARATORS = [' ', ' ', '\n', '\n\n', '']
+
+
+def incremental():
+    """Return the module with the incremental parsers. """
+    return get_style_module('parser', 'lexor', 'default').MOD['incremental']
+
+
+def check(parser, text):
+    """Parse `text` with `parser` and with a `Parser` and compare the
+    documents and the messages. """
+    parser.parse(text)
+    check_doc(parser.doc, parser.lexor_log, text)
+
+
+def edits(text):
+    """Return versions of `text` with lines inserted, changed and
+    removed. """
+    blocks = text.split('\n\n')
+    return [
+        text,
+        'New first block.\n\nwith two lines\n\n' + text,
+        '\n\n'.join(blocks[:1] + ['Changed *block*'] + blocks[2:]),
+        '\n\n'.join(blocks[:2] + blocks[3:]),
+        text + '\nAppended paragraph.\n',
+        text,
+    ]
+
+
+def test_incremental_edits():
+    """lexor.parser.default.incremental: edits """
+    for doc in DOCS:
+        parser = incremental().IncrementalParser()
+        for text in edits(doc):
+            check(parser, text)
+
+
+def test_incremental_autoclose():
+    """lexor.parser.default.incremental: auto-closed element moved """
+    parser = incremental().IncrementalParser()
+    text = 'Intro.\n\n<div><p>one<p>two</div>\n\nend\n'
+    check(parser, text)
+    check(parser, 'First.\n\nmore\nlines\n\n' + text)
+    eq_(messages(parser.lexor_log)[0][1:3], ('W100', [0, 0]))
+
+
+def test_parallel():
+    """lexor.parser.default.incremental: parallel parsing """
+    parser = incremental().ParallelParser(processes=2)
+    for doc in DOCS:
+        check(parser, doc)
+        check(parser, doc * 3)
+
+
+def test_stream():
+    """lexor.parser.default.incremental: parsing a stream in chunks """
+    for doc in DOCS:
+        expected = Parser('lexor', 'default')
+        expected.parse(doc, 'doc.lex')
+        for size in (1, 7, 64, 65536):
+            parser = incremental().StreamParser()
+            nodes = parser.iterparse(StringIO(doc), 'doc.lex', size)
+            eq_([dump(node) for node in nodes],
+                [dump(node) for node in expected.doc.child])
+            eq_(messages(parser.lexor_log), messages(expected.lexor_log))
+
+
+def test_stream_chunks():
+    """lexor.parser.default.incremental: stream read in random chunks """
+    rand = random.Random(0)
+    for _ in range(30):
+        doc = ''.join(
+            rand.choice(PIECES) + rand.choice(SEPARATORS)
+            for _ in range(rand.randint(3, 25))
+        ) + '\n'
+        expected = Parser('lexor', 'default')
+        expected.parse(doc, 'doc.lex')
+        for size in (1, rand.randint(2, 10), rand.randint(10, 50)):
+            parser = incremental().StreamParser()
+            nodes = parser.iterparse(StringIO(doc), 'doc.lex', size)
+            eq_([dump(node) for node in nodes],
+                [dump(node) for node in expected.doc.child])
+            eq_(messages(parser.lexor_log), messages(expected.lexor_log))
@@ -4,6 +4,8 @@ Testing suite to parse lexor inline in the default style.
 
 """
 
+from nose.tools import eq_
+from lexor.core.parser import Parser
 from lexor.command.test import nose_msg_explanations
 
 
@@ -12,3 +14,31 @@ def test_inline():
     nose_msg_explanations(
         'lexor', 'parser', 'default', 'inline'
     )
+
+
+def names(node):
+    """Return the names of the elements in the tree rooted at `node`
+    nested as the tree. """
+    result = list()
+    for child in node.child or ():
+        if child.child is not None:
+            result.append((child.name, names(child)))
+    return result
+
+
+def test_inline_blocks():
+    """lexor.parser.default.inline: closers past the enclosing block """
+    parser = Parser('lexor', 'default')
+    tests = [
+        ('A *em\n\nem* b\n', [('p', []), ('p', [])]),
+        ('# Head *a\n\nb*\n', [('h1', []), ('p', [])]),
+        ('A *em* b\n\n*c* d\n', [('p', [('em', [])]), ('p', [('em', [])])]),
+        ('%%{list}\n+ item *a\n\n+ b* c\n%%\n', [
+            ('list', [('list_item', [('p', [])]),
+                      ('list_item', [('p', [])])]),
+        ]),
+        ('<div>\n\nx *y\n\nz* w\n\n</div>\n', [('div', [('em', [])])]),
+    ]
+    for text, expected in tests:
+        parser.parse(text)
+        eq_(names(parser.doc), expected)
@@ -0,0 +1,64 @@
+"""LEXOR: DEFAULT parser INSTRUMENT test
+
+Testing suite to measure the node parsers of the default style.
+
+"""
+
+import shutil
+import tempfile
+from StringIO import StringIO
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.command.lang import get_style_module
+
+TEXT = 'A *em* and "quote".\n\n# Header\n'
+
+
+def totals(parser):
+    """Return the calls, hits and closes of each node parser. """
+    return dict(
+        (name, (record['calls'], record['hits'], record['closes']))
+        for name, record in parser['InstrumentNP'].report()
+    )
+
+
+def test_instrument_reset():
+    """lexor.parser.default.instrument: records of the last parse """
+    parser = Parser('lexor', 'default', {'profile': 'on'})
+    parser.parse(TEXT)
+    first = totals(parser)
+    eq_(first['EmNP'][1:], (1, 1))
+    parser.parse(TEXT)
+    eq_(totals(parser), first)
+    parser.parse('')
+    eq_(set(totals(parser).values()), set([(0, 0, 0)]))
+
+
+def test_instrument_parsers():
+    """lexor.parser.default.instrument: records of the style parsers """
+    mod = get_style_module('parser', 'lexor', 'default').MOD
+    expected = Parser('lexor', 'default', {'profile': 'on'})
+    expected.parse(TEXT)
+    parser = mod['incremental'].StreamParser(defaults={'profile': 'on'})
+    for _ in range(2):
+        list(parser.iterparse(StringIO(TEXT)))
+        eq_(totals(parser)['EmNP'][1:], (1, 1))
+    parser = mod['incremental'].IncrementalParser(
+        defaults={'profile': 'on'}
+    )
+    parser.parse(TEXT)
+    eq_(totals(parser), totals(expected))
+    parser.parse(TEXT + '\n')
+    eq_(totals(parser)['EmNP'][1:], (0, 0))
+    path = tempfile.mkdtemp(prefix='lexor-cache-')
+    try:
+        parser = mod['cache'].CachedParser(
+            defaults={'profile': 'on'}, path=path
+        )
+        parser.parse(TEXT)
+        eq_(totals(parser), totals(expected))
+        parser.parse(TEXT)
+        eq_(parser.hits, 1)
+        eq_(set(totals(parser).values()), set([(0, 0, 0)]))
+    finally:
+        shutil.rmtree(path, True)
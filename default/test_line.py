@@ -0,0 +1,65 @@
+"""LEXOR: DEFAULT parser LINE test
+
+Testing suite to limit the inline lexor node parsers to the block
+that contains them in the default style.
+
+"""
+
+import random
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from testing import dump, messages
+
+# Inline constructs that end in the block where they start. A header
+# line may end inside of a comment, the header then stays open after
+# the end of its line.
+INLINE = [
+    '*em*', '**strong**', '_s_', '`code`', '$x$', '"q"', "'q'", '[a](b)',
+    '[r]', '<m@a.b>', '<http://x.y>', '&amp;', 'word', 'text here',
+    '<!-- c -->', '<!-- note\n-->', '<span>x</span>', '\\\\', '{a}',
+]
+BLOCKS = ['', '', '# Title ', '## Sub {id=x} ', '%%{b}x%% ', '> ']
+
+
+def parse(text, window=True):
+    """Return the parser used to parse `text`. If `window` is False
+    the inline node parsers search up to the end of the text. """
+    parser = Parser('lexor', 'default')
+    parser.load_node_parsers()
+    if not window:
+        parser['LineNP'].window = lambda: parser.end
+    parser.parse(text)
+    return parser
+
+
+def test_line_header_comment():
+    """lexor.parser.default.line: header ending inside of a comment """
+    text = ('# Title <!-- note\n-->\n\n'
+            'Mail <m@a.b> and *em* and `code` and <http://x.y>\n')
+    parser = parse(text)
+    header = parser.doc[0]
+    eq_([node.name for node in header.child], [
+        '#text', '#comment', '#text', 'a', '#text', 'em', '#text', 'code',
+        '#text', 'a', '#text',
+    ])
+    eq_([header[3]['href'], header[9]['href']],
+        ['mailto:m@a.b', 'http://x.y'])
+    expected = parse(text, window=False)
+    eq_(dump(parser.doc), dump(expected.doc))
+    eq_(messages(parser.lexor_log), messages(expected.lexor_log))
+
+
+def test_line_window():
+    """lexor.parser.default.line: same documents within the blocks """
+    rand = random.Random(0)
+    for _ in range(100):
+        text = '\n\n'.join(
+            rand.choice(BLOCKS) + ' '.join(
+                rand.choice(INLINE) for _ in range(rand.randint(1, 6))
+            )
+            for _ in range(rand.randint(1, 6))
+        ) + '\n'
+        parser = parse(text)
+        expected = parse(text, window=False)
+        eq_(dump(parser.doc), dump(expected.doc))
+        eq_(messages(parser.lexor_log), messages(expected.lexor_log))
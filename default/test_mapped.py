@@ -0,0 +1,92 @@
+"""LEXOR: DEFAULT parser MAPPED test
+
+Testing suite to parse lexor files mapped into memory in the default
+style.
+
+"""
+
+import os
+import shutil
+import tempfile
+from nose.tools import eq_
+from testing import check
+from lexor.command.lang import get_style_module
+
+DOCS = [
+    'Intro paragraph with *emphasis*.\n\n'
+    '# Header {id=top}\n\n'
+    '<div><p>one<p>two</div>\n\n'
+    '~~~~\ncode\n\nmore code\n~~~~\n\n'
+    '<!-- a comment --> <![CDATA[data]]> <script>x < y</script>\n\n'
+    '%%{list}\n+ item *a*\n+ item "b\n\nc"\n%%\n\n'
+    'A [link][ref] and $x$.\n\n'
+    '[ref]: http://example.com\n',
+    '<div>\n\nunclosed\n\n<P>paragraph</p>\n\n<!DOCTYPE html>\n\nend',
+    '',
+]
+
+
+def mapped():
+    """Return the module with the mapped parser. """
+    return get_style_module('parser', 'lexor', 'default').MOD['mapped']
+
+
+def test_mapped_file():
+    """lexor.parser.default.mapped: same result as Parser.parse """
+    path = tempfile.mkdtemp(prefix='lexor-mapped-')
+    try:
+        parser = mapped().MappedParser()
+        for num, text in enumerate(DOCS):
+            name = os.path.join(path, 'doc%d.lex' % num)
+            with open(name, 'wb') as tmp:
+                tmp.write(text)
+            parser.parse_file(name)
+            check(parser.doc, parser.lexor_log, text, name)
+    finally:
+        shutil.rmtree(path, True)
+
+
+def test_mapped_encoding():
+    """lexor.parser.default.mapped: decoded text and attributes """
+    path = tempfile.mkdtemp(prefix='lexor-mapped-')
+    try:
+        text = u'Caf\xe9 <span title="\xe9t\xe9">cr\xe8me</span>\n'
+        name = os.path.join(path, 'doc.lex')
+        with open(name, 'wb') as tmp:
+            tmp.write(text.encode('utf-8'))
+        parser = mapped().MappedParser(encoding='utf-8')
+        parser.parse_file(name)
+        para = parser.doc[0]
+        eq_(para[0].data, u'Caf\xe9 ')
+        eq_(para[1]['title'], u'\xe9t\xe9')
+        eq_(para[1][0].data, u'cr\xe8me')
+    finally:
+        shutil.rmtree(path, True)
+
+
+def test_mapped_text():
+    """lexor.parser.default.mapped: methods of str """
+    path = tempfile.mkdtemp(prefix='lexor-mapped-')
+    try:
+        text = 'abc\nde\nabc'
+        name = os.path.join(path, 'doc.lex')
+        with open(name, 'wb') as tmp:
+            tmp.write(text)
+        mod = mapped()
+        with open(name, 'rb') as tmp:
+            data = mod.MappedText(
+                tmp.fileno(), 0, access=mod.mmap.ACCESS_READ
+            )
+        tests = [
+            ('abc', 0, None), ('abc', 7, None), ('abc', 1, None),
+            ('de', 4, 5), ('de', 4, 6), ('c', -1, None), (('x', 'de'), 4, None),
+        ]
+        for prefix, start, end in tests:
+            eq_(data.startswith(prefix, start, end),
+                text.startswith(prefix, start, end))
+        for sub, start, end in [('\n', 0, None), ('abc', 1, None),
+                                ('\n', 3, -1), ('c', -3, None)]:
+            eq_(data.count(sub, start, end), text.count(sub, start, end))
+        data.close()
+    finally:
+        shutil.rmtree(path, True)
@@ -0,0 +1,53 @@
+"""LEXOR: DEFAULT parser SCHEDULE test
+
+Testing suite to schedule the calls to close of the lexor node
+parsers in the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from testing import dump
+
+DOCS = [
+    'A *em* and **strong** and "quote" and [ref](x) _smart_ here.\n\n'
+    'More *em\n\ntext* "q" [r][s] `code` $x$\n\n[s]: http://x\n',
+    '# Header *a* {id=h}\n\nSetext *b*\n---\n\n'
+    '%%{list}\n+ item *a*\n+ item "b"\n%%\n',
+    '<div><p>one *two<p>three* four</div>\n\n<p>x\n\n<em>y</em>\n',
+]
+# Node parsers whose nodes close at a single offset, `close` is called
+# at most once for each of their nodes.
+CLOSE_AT = ['EmNP', 'StrongNP', 'SmartEmNP', 'ReferenceInlineNP']
+
+
+def parse(text, schedule):
+    """Return the parser used to parse `text` with the calls to
+    `close` recorded by `InstrumentNP`. """
+    parser = Parser('lexor', 'default', {
+        'profile': 'on', 'schedule': schedule,
+    })
+    parser.parse(text)
+    return parser
+
+
+def test_schedule_documents():
+    """lexor.parser.default.schedule: same documents as the main loop """
+    for text in DOCS:
+        expected = parse(text, 'off')
+        parser = parse(text, 'on')
+        eq_(dump(parser.doc), dump(expected.doc))
+        eq_([(msg['code'], msg['position']) for msg in parser.log.child],
+            [(msg['code'], msg['position']) for msg in expected.log.child])
+
+
+def test_schedule_close_at():
+    """lexor.parser.default.schedule: close only called where it closes """
+    for text in DOCS:
+        parser = parse(text, 'on')
+        unscheduled = dict(parse(text, 'off')['InstrumentNP'].report())
+        stats = dict(parser['InstrumentNP'].report())
+        for name in CLOSE_AT:
+            eq_(stats[name]['closes'] <= stats[name]['hits'], True)
+        for name in stats:
+            eq_(stats[name]['closes'] <= unscheduled[name]['closes'], True)
@@ -0,0 +1,93 @@
+"""LEXOR: DEFAULT parser SPAN test
+
+Testing suite to parse lexor with the nodes referring to the text in
+the default style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import CharacterData
+from lexor.command.lang import get_style_module
+from testing import dump
+
+LONG = ' '.join(['word'] * 60)
+DOCS = [
+    'Intro paragraph with *emphasis*.\n\n'
+    '# Header {id=top}\n\n'
+    '~~~~\ncode\n\nmore code\n~~~~\n\n'
+    '<!-- a comment --> <![CDATA[data]]> <script>x < y</script>\n\n'
+    'A [link][ref] and $x$.\n\n'
+    '[ref]: http://example.com\n',
+    '%s\n\n<!-- %s -->\n\n<![CDATA[%s]]>\n\n<script>%s</script>\n\n'
+    '`%s`\n\n$$%s$$\n\n    %s\n    %s\n\n~~~~\n%s\n~~~~\n' % (
+        (LONG,) * 9
+    ),
+    '%s *em* %s\n%s\n\n<div>%s\n\n%s</div>\n' % ((LONG,) * 5),
+]
+
+
+def spans(node):
+    """Return the number of nodes in the tree rooted at `node` whose
+    data has not been copied. The data of those nodes is not a
+    string. """
+    total = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CharacterData):
+            data = CharacterData.data.__get__(node, CharacterData)
+            if not isinstance(data, basestring):
+                total += 1
+        stack.extend(node.child or ())
+    return total
+
+
+def test_span_documents():
+    """lexor.parser.default.span: same documents as the eager nodes """
+    parser = Parser('lexor', 'default', {'lazy': 'on'})
+    expected = Parser('lexor', 'default')
+    for text in DOCS:
+        parser.parse(text)
+        expected.parse(text)
+        eq_(spans(expected.doc), 0)
+        eq_(dump(parser.doc), dump(expected.doc))
+        eq_(spans(parser.doc), 0)
+        eq_([(msg['code'], msg['position']) for msg in parser.log.child],
+            [(msg['code'], msg['position']) for msg in expected.log.child])
+
+
+def test_span_lazy():
+    """lexor.parser.default.span: long content kept as spans """
+    parser = Parser('lexor', 'default', {'lazy': 'on'})
+    parser.parse(DOCS[1])
+    eq_(spans(parser.doc), 7)
+    dump(parser.doc)
+    eq_(spans(parser.doc), 0)
+    parser.parse(DOCS[0])
+    eq_(spans(parser.doc), 0)
+
+
+def test_span_text():
+    """lexor.parser.default.span: runs of text joined into one span """
+    size = get_style_module('parser', 'lexor', 'default').MOD['span'].MIN_SPAN
+    parser = Parser('lexor', 'default', {'lazy': 'on'})
+    text = 'a' * (size - 1) + ' & ' + 'b' * (size - 2) + '\n'
+    parser.parse(text)
+    para = parser.doc[0]
+    eq_([spans(node) for node in para], [1, 0, 0])
+    eq_(para[0].data, text[:size])
+    eq_(para[2].data, text[size+1:-1])
+    parser.parse(text.replace('&', 'c'))
+    eq_(spans(parser.doc), 1)
+    eq_(parser.doc[0][0].data, text.replace('&', 'c')[:-1])
+
+
+def test_span_reload():
+    """lexor.parser.default.span: trees read after other parses """
+    parser = Parser('lexor', 'default', {'lazy': 'on'})
+    parser.parse(DOCS[1])
+    doc = parser.doc
+    expected = Parser('lexor', 'default')
+    expected.parse(DOCS[1])
+    eq_(dump(doc), dump(expected.doc))
@@ -0,0 +1,41 @@
+"""LEXOR: DEFAULT parser STACK test
+
+Testing suite to keep the values needed to close the nodes in
+progress out of the nodes in the default style.
+
+"""
+
+from nose.tools import eq_, assert_raises
+from lexor.core.parser import Parser
+from lexor.core.elements import Element
+
+DOCS = [
+    '# Title *a* {id=x}\n\nSetext "b" {att=v}\n===\n\n'
+    '[r](x) _s_ "q" **b** __c__ ***d*** ___e___\n',
+    '<div>*a "q</div> b* c"\n\n<p>a<p>b\n\n%%{span}[r]%%\n',
+]
+
+
+def test_stack_nodes():
+    """lexor.parser.default.stack: no parser fields on the nodes """
+    parser = Parser('lexor', 'default')
+    for text in DOCS:
+        parser.parse(text)
+        nodes = list(parser.doc.child)
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, Element):
+                eq_(sorted(set(vars(node)) - set(['_order', 'pos'])),
+                    sorted(node.attributes))
+            nodes.extend(node.child or ())
+
+
+def test_stack_autoclose():
+    """lexor.parser.default.stack: nodes closed with their parent """
+    parser = Parser('lexor', 'default')
+    parser.parse('<div>*a</div> b* "q"\n')
+    div = parser.doc[0]
+    eq_([div.name, div[0].name], ['div', 'em'])
+    stack = parser['StackNP']
+    assert_raises(KeyError, stack.end, div)
+    assert_raises(KeyError, stack.end, div[0])
@@ -0,0 +1,51 @@
+"""LEXOR: DEFAULT parser test helpers
+
+Functions shared by the testing suites that compare the documents
+obtained by the parsers of the default style with the ones obtained
+by `Parser.parse`. The name of this module contains `test` so that it
+is not loaded as one of the auxiliary modules of the style.
+
+"""
+
+from nose.tools import eq_
+from lexor.core.parser import Parser
+from lexor.core.elements import CharacterData, Element
+
+
+def node_class(node):
+    """Return the name of the class of `node` in lexor. The lazy nodes
+    of the `span` module are named after the class they extend. """
+    for cls in type(node).__mro__:
+        if cls.__module__.startswith('lexor.'):
+            return cls.__name__
+    return type(node).__name__
+
+
+def dump(node):
+    """Return the name, attributes, data and position of `node` and
+    its descendants. """
+    data = node.data if isinstance(node, CharacterData) else None
+    items = sorted(node.items()) if isinstance(node, Element) else None
+    child = [dump(item) for item in node.child or ()]
+    return (node_class(node), node.name, items, data, node.node_position,
+            child)
+
+
+def messages(log, uri=True):
+    """Return the contents of the messages in `log`, without their
+    uri if `uri` is False. """
+    return [
+        (msg['module'], msg['code'], list(msg['position']),
+         repr(msg['arg'])) + ((msg['uri'],) if uri else ())
+        for msg in log.child
+    ]
+
+
+def check(doc, log, text, uri=None, defaults=None):
+    """Compare a document and its log with the ones obtained by
+    parsing `text` with a `Parser`, which is returned. """
+    expected = Parser('lexor', 'default', defaults)
+    expected.parse(text, uri)
+    eq_(dump(doc), dump(expected.doc))
+    eq_(messages(log), messages(expected.lexor_log))
+    return expected